@@ -1,52 +1,217 @@
+import re
+from functools import lru_cache
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from pathlib import Path
-from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DBAPIError
 
 db = SQLAlchemy()
 login_manager = LoginManager()
 login_manager.login_view = "login"
 
-def create_app():
+# Perfil SQLite para varios puestos en la LAN: WAL deja leer mientras otro escribe
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -20000,        # ~20 MB (negativo = KiB)
+    "mmap_size": 268435456,      # 256 MB
+    "temp_store": "MEMORY",
+    "busy_timeout": 5000,        # ms esperando el lock en vez de "database is locked"
+}
+
+
+def _aplicar_pragmas(engine, pragmas):
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        cur = dbapi_conn.cursor()
+        for nombre, valor in pragmas.items():
+            cur.execute(f"PRAGMA {nombre}={valor}")
+        cur.close()
+
+
+MIGRACIONES_DIR = Path(__file__).resolve().parent.parent / "migrations"
+
+_REVISION = re.compile(r"^revision\s*=\s*['\"](\w+)['\"]", re.M)
+_DOWN_REVISION = re.compile(r"^down_revision\s*=\s*(.+)$", re.M)
+
+
+# Opciones de QueuePool: solo aplican a bases en archivo / servidor. SQLite en memoria usa
+# SingletonThreadPool/StaticPool, que no aceptan pool_size ni max_overflow.
+_OPCIONES_POOL = ("pool_size", "max_overflow", "pool_timeout")
+
+
+def _es_sqlite_en_memoria(uri):
+    url = make_url(uri)
+    return url.get_backend_name() == "sqlite" and (
+        url.database in (None, "", ":memory:") or url.query.get("mode") == "memory"
+    )
+
+
+@lru_cache(maxsize=None)
+def heads_migraciones(directorio=MIGRACIONES_DIR):
+    """Revisiones head de migrations/versions leyendo los archivos (sin importar alembic)."""
+    revisiones, padres = set(), set()
+    for f in (Path(directorio) / "versions").glob("*.py"):
+        texto = f.read_text(encoding="utf-8")
+        rev = _REVISION.search(texto)
+        if not rev:
+            continue
+        revisiones.add(rev.group(1))
+        down = _DOWN_REVISION.search(texto)
+        if down:
+            padres.update(re.findall(r"['\"](\w+)['\"]", down.group(1)))
+    return frozenset(revisiones - padres)
+
+
+def revision_actual():
+    """Revisión de Alembic de la base (None si es una base vacía o sin migrar)."""
+    try:
+        return db.session.execute(db.text("SELECT version_num FROM alembic_version")).scalar()
+    except DBAPIError:
+        db.session.rollback()
+        return None
+
+
+def _verificar_esquema(app):
+    # Una sola consulta al arrancar (antes: create_all + consultas de seed en cada arranque)
+    version = revision_actual()
+    heads = heads_migraciones()
+    if version not in heads:
+        app.logger.warning(
+            "La base está en la revisión %s y el código espera %s: correr `flask db upgrade` "
+            "(o `flask seed` si es una base nueva).", version, ", ".join(sorted(heads)),
+        )
+    return version
+
+
+def create_app(config=None, servidor=False):
+    """Arma la app. `servidor=True` solo desde run.py (el proceso que atiende requests):
+    verifica el esquema y arranca los workers de la cola. Sin eso (CLI `flask ...`,
+    tests) se registra flask_migrate y no se arranca nada en segundo plano.
+    """
     app = Flask(__name__, instance_relative_config=True)
 
     # Clave simple para entorno LAN interno (igual podés cambiarla)
     app.config["SECRET_KEY"] = "cambia-esta-clave"
     app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///" + str(Path(app.instance_path) / "app.db")
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": 10,
+        "max_overflow": 20,
+        "pool_timeout": 30,
+        "pool_pre_ping": True,
+    }
+    app.config["SQLITE_PRAGMAS"] = dict(SQLITE_PRAGMAS)
+
+    # Kanban /pedidos: tarjetas por columna y (opcional) días de FINALIZADO a mostrar
+    app.config["KANBAN_VENTANA"] = 30
+    app.config["KANBAN_FINALIZADOS_DIAS"] = None
+
+    # Exportación masiva de PDFs: procesos del pool (None = cantidad de núcleos)
+    app.config["PDF_WORKERS"] = None
+    app.config["PDF_CACHE_MAX_BYTES"] = 200 * 1024 * 1024
+
+    # Uploads: tope por request (Flask responde 413) y por comprobante
+    app.config["MAX_CONTENT_LENGTH"] = 32 * 1024 * 1024
+    app.config["COMPROBANTE_MAX_BYTES"] = 10 * 1024 * 1024
+
+    # Recodificación opcional de fotos de comprobantes (lado máximo en px, calidad JPEG)
+    app.config["COMPROBANTE_RECODIFICAR"] = False
+    app.config["COMPROBANTE_MAX_LADO"] = 2000
+    app.config["COMPROBANTE_CALIDAD"] = 80
+    app.config["COMPROBANTE_GUARDAR_ORIGINAL"] = False
+
+    # Entrega de comprobantes: None (Flask), "x-sendfile" o "x-accel" (nginx, con el prefijo internal)
+    app.config["COMPROBANTES_SENDFILE"] = None
+    app.config["COMPROBANTES_ACCEL_PREFIX"] = "/_comprobantes"
+
+    # Cola de trabajos (app/trabajos.py): hilos, espera entre sondeos, plazo de un trabajo
+    # corriendo antes de darlo por perdido y espera base entre reintentos (segundos)
+    app.config["TRABAJOS_WORKERS"] = 2
+    app.config["TRABAJOS_INTERVALO"] = 5
+    app.config["TRABAJOS_PLAZO"] = 15 * 60
+    app.config["TRABAJOS_ESPERA_REINTENTO"] = 10
+
+    # Eventos en vivo: duración de cada conexión SSE y espera máxima del long-poll (segundos).
+    # MAX_ESPERAS = SSE + long-polls abiertos a la vez (cada uno ocupa un hilo): cada
+    # pestaña de pedidos o dashboard abierta usa uno, así que va dimensionado para varios
+    # puestos con un par de pestañas cada uno. Pasado el límite, SSE recibe 503 y el
+    # long-poll contesta enseguida: esas pestañas pasan a preguntar cada POLL_INTERVALO
+    # segundos (con backoff en el navegador) sin tomar un hilo.
+    app.config["EVENTOS_SSE_DURACION"] = 300
+    app.config["EVENTOS_LONGPOLL_TIMEOUT"] = 25
+    app.config["EVENTOS_MAX_ESPERAS"] = 32
+    app.config["EVENTOS_POLL_INTERVALO"] = 5
+
+    # Servidor de producción (`python run.py --serve`, app/servidor.py). HILOS = hilos para
+    # requests normales; waitress arranca HILOS + EVENTOS_MAX_ESPERAS. TIMEOUT = segundos
+    # sin actividad antes de cerrar una conexión (keep-alive ociosa o cliente trabado);
+    # APAGADO = espera a los requests en curso al recibir SIGTERM/Ctrl+C.
+    app.config["SERVIDOR_HOST"] = "0.0.0.0"
+    app.config["SERVIDOR_PUERTO"] = 5000
+    app.config["SERVIDOR_HILOS"] = 8
+    app.config["SERVIDOR_CONEXIONES"] = 100
+    app.config["SERVIDOR_TIMEOUT"] = 120
+    app.config["SERVIDOR_APAGADO"] = 15
+
+    # Overrides sin tocar código: instance/config.py y variables FLASK_*
+    # (ej. FLASK_SQLALCHEMY_DATABASE_URI=postgresql://..., FLASK_SQLITE_PRAGMAS__cache_size=-64000,
+    #  FLASK_SQLALCHEMY_ENGINE_OPTIONS__pool_size=20)
+    app.config.from_pyfile("config.py", silent=True)
+    app.config.from_prefixed_env()
+    # Overrides explícitos (tests)
+    app.config.update(config or {})
+    if _es_sqlite_en_memoria(app.config["SQLALCHEMY_DATABASE_URI"]):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+            k: v for k, v in app.config["SQLALCHEMY_ENGINE_OPTIONS"].items() if k not in _OPCIONES_POOL
+        }
+    if app.config["COMPROBANTES_SENDFILE"] == "x-sendfile":
+        app.config["USE_X_SENDFILE"] = True
 
     Path(app.instance_path).mkdir(parents=True, exist_ok=True)
     # uploads (comprobantes)
-    uploads_dir = Path(app.instance_path) / "uploads" / "comprobantes"
+    uploads_dir = Path(app.config.get("UPLOADS_DIR") or Path(app.instance_path) / "uploads" / "comprobantes")
     uploads_dir.mkdir(parents=True, exist_ok=True)
     app.config["UPLOADS_DIR"] = str(uploads_dir)
 
-    db.init_app(app)
-    migrate = Migrate(app, db)
-    login_manager.init_app(app)
+    # cache de PDFs generados (LRU acotado por tamaño)
+    pdf_cache_dir = Path(app.config.get("PDF_CACHE_DIR") or Path(app.instance_path) / "pdf_cache")
+    pdf_cache_dir.mkdir(parents=True, exist_ok=True)
+    app.config["PDF_CACHE_DIR"] = str(pdf_cache_dir)
 
-    from .models import User, Producto, PrecioPorMetro, Pedido, PedidoItem
+    # ZIPs generados por trabajos en segundo plano
+    exportaciones_dir = Path(app.config.get("EXPORTACIONES_DIR") or Path(app.instance_path) / "exportaciones")
+    exportaciones_dir.mkdir(parents=True, exist_ok=True)
+    app.config["EXPORTACIONES_DIR"] = str(exportaciones_dir)
 
-    with app.app_context():
-        db.create_all()
+    db.init_app(app)
 
-        # Seed: 1 usuario admin
-        if not User.query.first():
-            admin = User.create_default_admin()
-            db.session.add(admin)
+    with app.app_context():
+        if db.engine.dialect.name == "sqlite":
+            _aplicar_pragmas(db.engine, app.config["SQLITE_PRAGMAS"])
 
-        # Seed: precios por metro iniciales (como tu ConfiguracionView)
-        if PrecioPorMetro.query.count() == 0:
-            db.session.add(PrecioPorMetro(material="Melamina", precio=7000))
-            db.session.add(PrecioPorMetro(material="Chapa MDF", precio=6800))
-            db.session.add(PrecioPorMetro(material="Melamina premium", precio=8500))
+    login_manager.init_app(app)
 
-        db.session.commit()
+    # flask_migrate (y alembic) solo hacen falta para `flask db ...` y `flask seed`
+    if servidor:
+        with app.app_context():
+            _verificar_esquema(app)
+    else:
+        from flask_migrate import Migrate
+        Migrate(app, db)
 
     from .auth import register_auth
     from .routes import register_routes
+    from .cli import register_cli
     register_auth(app)
     register_routes(app)
+    register_cli(app)
+
+    if servidor:
+        from . import trabajos
+        trabajos.iniciar(app)
 
     return app
\ No newline at end of file
@@ -0,0 +1,129 @@
+import re
+from sqlalchemy import or_
+from . import db
+from .models import Pedido
+
+# Índice FTS5 (solo SQLite): rowid = pedido.id. remove_diacritics hace que
+# "jose" encuentre "José"; prefix acelera las búsquedas de 2-3 letras.
+# Las migraciones tienen su propia copia congelada; TABLA la usa migrations/env.py
+# para que autogenerate no toque el índice.
+TABLA = "pedido_fts"
+
+DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS pedido_fts USING fts5(
+        cliente, telefono, direccion, observaciones, items,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_fts_ai AFTER INSERT ON pedido BEGIN
+        INSERT INTO pedido_fts (rowid, cliente, telefono, direccion, observaciones, items)
+        VALUES (NEW.id, NEW.cliente, NEW.telefono, NEW.direccion, NEW.observaciones, '');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_fts_au AFTER UPDATE OF cliente, telefono, direccion, observaciones ON pedido BEGIN
+        UPDATE pedido_fts SET cliente = NEW.cliente, telefono = NEW.telefono,
+            direccion = NEW.direccion, observaciones = NEW.observaciones
+        WHERE rowid = NEW.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_fts_ad AFTER DELETE ON pedido BEGIN
+        DELETE FROM pedido_fts WHERE rowid = OLD.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_item_fts_ai AFTER INSERT ON pedido_item BEGIN
+        UPDATE pedido_fts SET items = (
+            SELECT group_concat(descripcion, ' ') FROM pedido_item WHERE pedido_id = NEW.pedido_id
+        ) WHERE rowid = NEW.pedido_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_item_fts_au AFTER UPDATE OF descripcion ON pedido_item BEGIN
+        UPDATE pedido_fts SET items = (
+            SELECT group_concat(descripcion, ' ') FROM pedido_item WHERE pedido_id = NEW.pedido_id
+        ) WHERE rowid = NEW.pedido_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_item_fts_ad AFTER DELETE ON pedido_item BEGIN
+        UPDATE pedido_fts SET items = (
+            SELECT group_concat(descripcion, ' ') FROM pedido_item WHERE pedido_id = OLD.pedido_id
+        ) WHERE rowid = OLD.pedido_id;
+    END""",
+]
+
+LLENAR = (
+    "INSERT INTO pedido_fts (rowid, cliente, telefono, direccion, observaciones, items) "
+    "SELECT p.id, p.cliente, p.telefono, p.direccion, p.observaciones, "
+    "coalesce((SELECT group_concat(i.descripcion, ' ') FROM pedido_item i WHERE i.pedido_id = p.id), '') "
+    "FROM pedido p"
+)
+
+# Peso por columna para bm25 (mismo orden que en la tabla): el cliente pesa más
+PESOS = "10.0, 6.0, 2.0, 1.0, 3.0"
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def disponible():
+    if db.engine.dialect.name != "sqlite":
+        return False
+    return db.session.execute(
+        db.text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'pedido_fts'")
+    ).first() is not None
+
+
+def reconstruir():
+    """Crea (si falta) y vuelve a llenar el índice desde pedido y pedido_item."""
+    for sql in DDL:
+        db.session.execute(db.text(sql))
+    db.session.execute(db.text("DELETE FROM pedido_fts"))
+    db.session.execute(db.text(LLENAR))
+    db.session.commit()
+    return db.session.execute(db.text("SELECT count(*) FROM pedido_fts")).scalar()
+
+
+def consulta_fts(texto):
+    # Cada palabra como prefijo entre comillas (sin operadores FTS del usuario): "mel"* "ped"*
+    tokens = _TOKEN.findall(texto or "")
+    if not tokens:
+        return None
+    return " ".join(f'"{t}"*' for t in tokens)
+
+
+def buscar(texto, estado=None, limit=50, offset=0, total=False):
+    """ids de pedidos activos que matchean `texto`, ordenados por relevancia.
+
+    Devuelve (ids, total | None). Sin FTS cae a ILIKE sobre los campos del pedido.
+    """
+    if not disponible():
+        return _buscar_like(texto, estado, limit, offset, total)
+
+    q = consulta_fts(texto)
+    if q is None:
+        return [], (0 if total else None)
+
+    filtro = "pedido_fts MATCH :q AND p.activo = 1"
+    params = {"q": q, "limit": limit, "offset": offset}
+    if estado:
+        filtro += " AND p.estado = :estado"
+        params["estado"] = estado
+
+    ids = db.session.execute(db.text(
+        f"SELECT p.id FROM pedido_fts JOIN pedido p ON p.id = pedido_fts.rowid "
+        f"WHERE {filtro} ORDER BY bm25(pedido_fts, {PESOS}), p.id DESC LIMIT :limit OFFSET :offset"
+    ), params).scalars().all()
+
+    cantidad = None
+    if total:
+        cantidad = db.session.execute(db.text(
+            f"SELECT count(*) FROM pedido_fts JOIN pedido p ON p.id = pedido_fts.rowid WHERE {filtro}"
+        ), params).scalar()
+    return ids, cantidad
+
+
+def _buscar_like(texto, estado, limit, offset, total):
+    query = db.session.query(Pedido.id).filter(Pedido.activo == True)
+    for t in _TOKEN.findall(texto or ""):
+        patron = f"%{t}%"
+        query = query.filter(or_(
+            Pedido.cliente.ilike(patron), Pedido.telefono.ilike(patron),
+            Pedido.direccion.ilike(patron), Pedido.observaciones.ilike(patron),
+        ))
+    if estado:
+        query = query.filter(Pedido.estado == estado)
+
+    cantidad = query.count() if total else None
+    ids = [r.id for r in query.order_by(Pedido.id.desc()).limit(limit).offset(offset)]
+    return ids, cantidad
@@ -0,0 +1,61 @@
+import hashlib
+import json
+from collections import namedtuple
+from threading import Lock
+from .models import Producto, PrecioPorMetro
+
+# Copia inmutable de un Producto (no queda atada a la sesión del request)
+ProductoCat = namedtuple("ProductoCat", ["id", "nombre", "material", "precio", "por_metro"])
+
+# Catálogo en memoria (productos + precios por metro); se reconstruye cuando cambia la versión
+_lock = Lock()
+_version = 0
+_cache = None
+
+
+def invalidar():
+    # Llamar después del commit en productos_post, productos_delete y configuracion_post
+    global _version, _cache
+    with _lock:
+        _version += 1
+        _cache = None
+
+
+def _construir(version):
+    productos = [
+        ProductoCat(p.id, p.nombre, p.material, float(p.precio or 0.0), bool(p.por_metro))
+        for p in Producto.query.order_by(Producto.nombre.asc()).all()
+    ]
+    precios_pm = {x.material: float(x.precio) for x in PrecioPorMetro.query.all()}
+
+    payload = {
+        "productos": [p._asdict() for p in productos],
+        "precios_pm": precios_pm,
+    }
+    # ETag por contenido: sigue siendo válido aunque se reinicie el proceso
+    etag = hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    return {
+        "version": version,
+        "etag": etag,
+        "productos": productos,
+        "por_id": {p.id: p for p in productos},
+        "precios_pm": precios_pm,
+        "payload": payload,
+    }
+
+
+def obtener():
+    global _cache
+    with _lock:
+        if _cache is not None:
+            return _cache
+        version = _version
+
+    cat = _construir(version)
+
+    # Si se invalidó mientras lo armábamos, lo usamos igual pero no lo guardamos
+    with _lock:
+        if version == _version:
+            _cache = cat
+    return cat
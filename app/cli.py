@@ -0,0 +1,200 @@
+import os
+import json
+import multiprocessing
+import click
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import timedelta
+from sqlalchemy import func, update
+from . import db, revision_actual, heads_migraciones, esquema_base, estadisticas, importacion, pdf, comprobantes, busqueda
+from .models import Pedido, Pago, PagoComprobante, siguiente_cambio
+from .models import User, PrecioPorMetro, Secuencia
+
+
+def register_cli(app):
+    @app.cli.command("reconstruir-ventas")
+    def reconstruir_ventas():
+        """Recalcula la tabla venta_diaria desde el historial de pedidos."""
+        filas = estadisticas.reconstruir_rollup()
+        click.echo(f"venta_diaria reconstruida: {filas} filas.")
+
+    @app.cli.command("importar-pedidos")
+    @click.argument("archivo", type=click.Path(exists=True, dir_okay=False))
+    def importar_pedidos(archivo):
+        """Importa pedidos (con items y pagos) desde un .csv o .json en una sola transacción."""
+        with open(archivo, encoding="utf-8-sig") as f:
+            contenido = f.read()
+
+        if archivo.lower().endswith(".json"):
+            datos = json.loads(contenido)
+            registros = datos.get("pedidos", []) if isinstance(datos, dict) else datos
+        else:
+            registros = importacion.leer_csv(contenido)
+
+        try:
+            creados = importacion.importar_pedidos(registros)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+        click.echo(f"{creados} pedidos importados.")
+
+    @app.cli.command("reconciliar-saldos")
+    @click.option("--corregir", is_flag=True, help="Reescribe total_pagado/saldo con lo calculado desde Pago.")
+    def reconciliar_saldos(corregir):
+        """Verifica Pedido.total_pagado/saldo contra la suma real de sus pagos."""
+        pagado = (
+            db.session.query(Pago.pedido_id, func.sum(Pago.monto_pagado).label("suma"))
+            .group_by(Pago.pedido_id)
+            .subquery()
+        )
+        filas = (
+            db.session.query(
+                Pedido.id, Pedido.total, Pedido.monto_sena, Pedido.total_pagado, Pedido.saldo,
+                func.coalesce(pagado.c.suma, 0.0)
+            )
+            .outerjoin(pagado, pagado.c.pedido_id == Pedido.id)
+            .all()
+        )
+
+        diferencias = []
+        for pid, total, sena, total_pagado, saldo, suma in filas:
+            saldo_real = float(total or 0.0) - float(sena or 0.0) - float(suma)
+            if abs(total_pagado - suma) > 0.005 or abs(saldo - saldo_real) > 0.005:
+                diferencias.append({"id": pid, "total_pagado": float(suma), "saldo": saldo_real})
+                click.echo(f"pedido #{pid}: pagado {total_pagado} (real {suma}), saldo {saldo} (real {saldo_real})")
+
+        if diferencias and corregir:
+            # Los corregidos también viajan en el próximo sync (/api/pedidos?since=)
+            primero = siguiente_cambio(len(diferencias)) - len(diferencias) + 1
+            for i, d in enumerate(diferencias):
+                d["cambio"] = primero + i
+            db.session.execute(update(Pedido), diferencias)
+            db.session.commit()
+            click.echo(f"{len(diferencias)} pedido(s) corregidos.")
+        elif diferencias:
+            raise click.ClickException(f"{len(diferencias)} pedido(s) con saldo inconsistente (usar --corregir).")
+        else:
+            click.echo(f"{len(filas)} pedidos verificados, sin diferencias.")
+
+    @app.cli.command("exportar-pdfs")
+    @click.argument("salida", type=click.Path(dir_okay=False, writable=True))
+    @click.option("--estado", type=click.Choice(estadisticas.ESTADOS))
+    @click.option("--desde", type=click.DateTime(["%Y-%m-%d"]), help="Creados desde (inclusive).")
+    @click.option("--hasta", type=click.DateTime(["%Y-%m-%d"]), help="Creados hasta (inclusive).")
+    @click.option("--ids", help="Lista de ids separados por coma.")
+    @click.option("--workers", type=int, help="Procesos para renderizar (default: núcleos).")
+    def exportar_pdfs(salida, estado, desde, hasta, ids, workers):
+        """Genera un ZIP con el PDF de cada pedido que cumple el filtro."""
+        ids = [int(x) for x in ids.split(",") if x.strip()] if ids else None
+        hasta = hasta + timedelta(days=1) if hasta else None
+        query = pdf.consulta_exportacion(estado=estado, desde=desde, hasta=hasta, ids=ids)
+
+        with open(salida, "wb") as f:
+            for chunk in pdf.zip_pdfs(query, workers=workers or app.config.get("PDF_WORKERS")):
+                f.write(chunk)
+        click.echo(f"ZIP generado: {salida}")
+
+    @app.cli.command("recomprimir-comprobantes")
+    @click.option("--max-lado", type=int, help="Lado máximo en px (default: COMPROBANTE_MAX_LADO).")
+    @click.option("--calidad", type=int, help="Calidad JPEG (default: COMPROBANTE_CALIDAD).")
+    @click.option("--workers", type=int, help="Procesos en paralelo (default: núcleos).")
+    def recomprimir_comprobantes(max_lado, calidad, workers):
+        """Achica las imágenes de comprobantes ya guardadas (con nombre nuevo) e informa los bytes ahorrados."""
+        uploads_dir = app.config["UPLOADS_DIR"]
+        max_lado = max_lado or app.config["COMPROBANTE_MAX_LADO"]
+        calidad = calidad or app.config["COMPROBANTE_CALIDAD"]
+
+        nombres = [
+            n for n in sorted(os.listdir(uploads_dir))
+            if os.path.splitext(n)[1].lower() in comprobantes.RECODIFICABLES
+            and ".thumb." not in n and ".orig." not in n
+        ]
+        # Fotos viejas con extensión .jpeg
+        nombres += [n for n in sorted(os.listdir(uploads_dir)) if n.lower().endswith(".jpeg")]
+
+        ctx = multiprocessing.get_context("spawn")
+        antes_total = despues_total = errores = 0
+        renombrados = {}
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            futuros = {
+                pool.submit(comprobantes.recomprimir_guardado, uploads_dir, n, max_lado, calidad): n
+                for n in nombres
+            }
+            for fut in as_completed(futuros):
+                nombre = futuros[fut]
+                try:
+                    nuevo, antes, despues = fut.result()
+                except Exception as e:
+                    errores += 1
+                    click.echo(f"ERROR  {nombre}: {e}")
+                    continue
+
+                antes_total += antes
+                despues_total += despues
+                if nuevo is not None:
+                    renombrados[nombre] = (nuevo, despues)
+
+        # Nombre nuevo = sha nuevo (los viejos están cacheados como immutable en los browsers)
+        pedidos = set()
+        for nombre, (nuevo, despues) in renombrados.items():
+            filas = PagoComprobante.query.filter(PagoComprobante.filename == nombre).all()
+            for c in filas:
+                c.filename = nuevo
+                c.size_bytes = despues
+                c.mimetype = comprobantes.MIMETYPES.get(os.path.splitext(nuevo)[1], c.mimetype)
+                pedidos.add(c.pago.pedido)
+
+        # El detalle cacheado (ETag por cambio) tiene las URLs viejas
+        for p in pedidos:
+            p.marcar_cambio()
+        db.session.commit()
+
+        for nombre, (nuevo, _) in renombrados.items():
+            # El original sin recodificar (COMPROBANTE_GUARDAR_ORIGINAL) sigue al nombre nuevo
+            original = comprobantes.ruta_original(uploads_dir, nombre)
+            if os.path.exists(original):
+                os.replace(original, comprobantes.ruta_original(uploads_dir, nuevo))
+            comprobantes.borrar_guardado(uploads_dir, nombre)
+
+        ahorro = antes_total - despues_total
+        click.echo(
+            f"{len(nombres)} imágenes, {len(renombrados)} recomprimidas, {errores} con error: "
+            f"{antes_total / 1e6:.1f} MB -> {despues_total / 1e6:.1f} MB (ahorro {ahorro / 1e6:.1f} MB)."
+        )
+
+    @app.cli.command("reconstruir-busqueda")
+    def reconstruir_busqueda():
+        """Crea (si falta) y vuelve a llenar el índice FTS5 de /api/buscar."""
+        if db.engine.dialect.name != "sqlite":
+            click.echo("El índice FTS5 solo aplica a SQLite (en otros motores se usa ILIKE).")
+            return
+        filas = busqueda.reconstruir()
+        click.echo(f"Índice de búsqueda reconstruido: {filas} pedidos.")
+
+    @app.cli.command("seed")
+    def seed():
+        """Datos iniciales: admin, secuencia de cambios y precios por metro (solo lo que falte).
+
+        Si la base no está en el head de Alembic (o está vacía) antes corre las migraciones.
+        """
+        revision = revision_actual()
+        if revision not in heads_migraciones():
+            from flask_migrate import upgrade
+            if revision is None:
+                esquema_base.crear(db.engine)   # lo que la primera migración da por existente
+            upgrade()
+            click.echo("Esquema migrado.")
+
+        if not User.query.first():
+            db.session.add(User.create_default_admin())
+            click.echo("Usuario admin creado.")
+
+        # Secuencia de cambios de pedidos (sync por /api/pedidos?since=)
+        if not db.session.get(Secuencia, "cambios"):
+            db.session.add(Secuencia(nombre="cambios", valor=db.session.query(func.coalesce(func.max(Pedido.id), 0)).scalar()))
+
+        if PrecioPorMetro.query.count() == 0:
+            db.session.add(PrecioPorMetro(material="Melamina", precio=7000))
+            db.session.add(PrecioPorMetro(material="Chapa MDF", precio=6800))
+            db.session.add(PrecioPorMetro(material="Melamina premium", precio=8500))
+            click.echo("Precios por metro iniciales cargados.")
+
+        db.session.commit()
@@ -0,0 +1,140 @@
+import re
+import unicodedata
+from datetime import datetime
+from sqlalchemy import insert, or_, and_
+from . import db
+from .models import Cliente
+
+_NO_DIGITOS = re.compile(r"\D")
+# Separadores habituales al tipear un teléfono: "(351) 555-1234", "+54 9 351..."
+_SEPARADORES_TELEFONO = re.compile(r"[\s\-().+]")
+
+# Tope para la búsqueda por prefijo: p <= x < p + _FIN
+_FIN = "\uffff"
+
+
+def normalizar_nombre(nombre):
+    # minúsculas, sin acentos y con espacios simples: "José  Pérez" -> "jose perez"
+    s = unicodedata.normalize("NFKD", nombre or "")
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return " ".join(s.lower().split())
+
+
+def normalizar_telefono(telefono):
+    """Solo dígitos, sin prefijo de país (54/549) ni 0 de larga distancia.
+
+    "+54 9 351 555-1234", "0351 5551234" y "351-555-1234" -> "3515551234".
+    """
+    d = _NO_DIGITOS.sub("", telefono or "")
+    if d.startswith("54") and len(d) >= 12:
+        d = d[2:]
+        if d.startswith("9") and len(d) == 11:
+            d = d[1:]
+    d = d.lstrip("0")
+    return d or None
+
+
+def _actualizar(c, nombre, telefono, direccion, email):
+    # Los datos más nuevos pisan a los viejos (sin borrar lo que no vino)
+    c.nombre = nombre or c.nombre
+    c.nombre_normalizado = normalizar_nombre(c.nombre)
+    c.telefono = telefono or c.telefono
+    c.direccion = direccion or c.direccion
+    c.email = email or c.email
+
+
+def obtener_o_crear(nombre, telefono, direccion=None, email=None):
+    """Cliente con ese teléfono (lookup por índice único) o uno nuevo. None si no hay teléfono."""
+    tel = normalizar_telefono(telefono)
+    if tel is None:
+        return None
+
+    c = Cliente.query.filter_by(telefono_normalizado=tel).first()
+    if c is None:
+        c = Cliente(telefono_normalizado=tel)
+        db.session.add(c)
+    _actualizar(c, nombre, telefono, direccion, email)
+    return c
+
+
+def vincular_lote(pedidos):
+    """Asigna cliente_id a dicts de pedido (importación): una consulta y un INSERT para todo el lote."""
+    por_tel = {}
+    for p in pedidos:
+        tel = normalizar_telefono(p.get("telefono"))
+        if tel:
+            por_tel[tel] = p          # el último del lote define los datos
+
+    if not por_tel:
+        return
+
+    existentes = {
+        c.telefono_normalizado: c
+        for c in Cliente.query.filter(Cliente.telefono_normalizado.in_(list(por_tel)))
+    }
+    for tel, c in existentes.items():
+        p = por_tel[tel]
+        _actualizar(c, p["cliente"], p.get("telefono"), p.get("direccion"), p.get("email"))
+
+    nuevos = [
+        {
+            "nombre": p["cliente"],
+            "nombre_normalizado": normalizar_nombre(p["cliente"]),
+            "telefono": p.get("telefono"),
+            "telefono_normalizado": tel,
+            "direccion": p.get("direccion"),
+            "email": p.get("email"),
+            "created_at": datetime.utcnow(),
+        }
+        for tel, p in por_tel.items() if tel not in existentes
+    ]
+    if nuevos:
+        filas = db.session.execute(
+            insert(Cliente).returning(Cliente.id, Cliente.telefono_normalizado), nuevos
+        ).all()
+        ids = {tel: cid for cid, tel in filas}
+    else:
+        ids = {}
+    ids.update({tel: c.id for tel, c in existentes.items()})
+
+    for p in pedidos:
+        tel = normalizar_telefono(p.get("telefono"))
+        p["cliente_id"] = ids.get(tel)
+
+
+def _prefijos_telefono(digitos):
+    """Prefijos a buscar para lo que se va tipeando, con el criterio de normalizar_telefono.
+
+    Un número a medio tipear es corto, así que "+54 9 351" no llega a los 12 dígitos de
+    normalizar_telefono: se saca igual el 54/549 y el 0. Como un número local también
+    puede empezar con 54, se busca con y sin el prefijo.
+    """
+    d = digitos.lstrip("0")
+    prefijos = {d}
+    if d.startswith("549"):
+        prefijos.add(d[3:].lstrip("0"))
+    elif d.startswith("54"):
+        prefijos.add(d[2:].lstrip("0"))
+    return sorted(p for p in prefijos if p)
+
+
+def autocompletar(texto, limit=10):
+    """Clientes cuyo nombre (o teléfono, si se tipean dígitos) empieza con `texto`."""
+    digitos = _SEPARADORES_TELEFONO.sub("", texto or "")
+    query = Cliente.query
+
+    if len(digitos) >= 3 and digitos.isascii() and digitos.isdigit():
+        query = query.filter(or_(*(
+            and_(Cliente.telefono_normalizado >= p, Cliente.telefono_normalizado < p + _FIN)
+            for p in _prefijos_telefono(digitos)
+        ))).order_by(Cliente.telefono_normalizado.asc())
+    else:
+        prefijo = normalizar_nombre(texto)
+        if not prefijo:
+            return []
+        query = query.filter(
+            Cliente.nombre_normalizado >= prefijo,
+            Cliente.nombre_normalizado < prefijo + _FIN,
+        ).order_by(Cliente.nombre_normalizado.asc())
+
+    return query.limit(limit).all()
@@ -0,0 +1,254 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+# Tipos aceptados y extensión con la que se guarda el blob
+TIPOS = {
+    "application/pdf": ".pdf",
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+}
+MIMETYPES = {ext: mime for mime, ext in TIPOS.items()}
+
+CHUNK = 64 * 1024
+
+# Miniaturas para el modal de pagos (las genera la cola de trabajos después del upload)
+MINIATURA_LADO = 320
+MINIATURA_CALIDAD = 75
+
+
+class ArchivoMuyGrande(ValueError):
+    pass
+
+
+def _publicar(tmp, destino):
+    # mkstemp crea con 0600; el proxy (modo x-accel / x-sendfile) tiene que poder leerlo
+    os.chmod(tmp, 0o644)
+    os.replace(tmp, destino)
+
+
+def _publicar_por_contenido(tmp, uploads_dir, ext, sha=None):
+    """Publica `tmp` como sha256(bytes) + ext; si ya existe descarta el temporal.
+
+    Única regla de nombres (upload y recompresión): el nombre es el hash de lo que se
+    guarda, así se sirve como immutable (ETag = sha) y el mismo contenido queda una vez.
+    """
+    filename = (sha or _sha256_archivo(tmp)) + ext
+    destino = os.path.join(uploads_dir, filename)
+    if os.path.exists(destino):
+        os.remove(tmp)
+    else:
+        _publicar(tmp, destino)
+    return filename
+
+
+def guardar(file, uploads_dir, max_bytes, recodificacion=None):
+    """Copia el upload por chunks a un temporal calculando el SHA-256.
+
+    El nombre final es el hash de lo guardado (+ extensión): si el mismo comprobante
+    ya estaba se descarta el temporal y se reutiliza el existente. Con `recodificacion`
+    (ver opciones_recodificacion) las imágenes se achican antes de guardarlas; la
+    recodificación es determinística, así que subir de nuevo la misma foto da el mismo
+    archivo (también después de `flask recomprimir-comprobantes` con esos parámetros).
+    Devuelve (filename, size_bytes guardados). Lanza ArchivoMuyGrande si supera max_bytes.
+    """
+    ext = TIPOS[file.mimetype]
+    sha = hashlib.sha256()
+    size = 0
+    original = None
+
+    fd, tmp = tempfile.mkstemp(dir=uploads_dir, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while True:
+                chunk = file.stream.read(CHUNK)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise ArchivoMuyGrande(f"El archivo supera {max_bytes / (1024 * 1024):.1f} MB")
+                sha.update(chunk)
+                out.write(chunk)
+
+        filename = sha.hexdigest() + ext
+        if os.path.exists(os.path.join(uploads_dir, filename)):
+            # Ya guardado tal cual se subió (sin recodificar, o recodificar no ahorraba)
+            os.remove(tmp)
+        elif recodificacion and ext in RECODIFICABLES:
+            if recodificacion.get("guardar_original"):
+                original = tmp + ".orig"
+                shutil.copyfile(tmp, original)
+            antes, despues = recodificar(tmp, recodificacion["max_lado"], recodificacion["calidad"], ext)
+            filename = _publicar_por_contenido(tmp, uploads_dir, ext, None if despues < antes else sha.hexdigest())
+            if original:
+                os.replace(original, ruta_original(uploads_dir, filename))
+        else:
+            filename = _publicar_por_contenido(tmp, uploads_dir, ext, sha.hexdigest())
+    except BaseException:
+        for path in (tmp, original):
+            if path and os.path.exists(path):
+                os.remove(path)
+        raise
+
+    return filename, os.path.getsize(os.path.join(uploads_dir, filename))
+
+
+# ---------- RECODIFICACIÓN ----------
+# Solo imágenes; los PDF se guardan tal cual
+RECODIFICABLES = {".jpg": "JPEG", ".png": "PNG"}
+
+# Ahorro mínimo para reemplazar un archivo (evita recomprimir JPEGs ya comprimidos)
+AHORRO_MINIMO = 0.10
+
+
+def opciones_recodificacion(config):
+    if not config.get("COMPROBANTE_RECODIFICAR"):
+        return None
+    return {
+        "max_lado": config["COMPROBANTE_MAX_LADO"],
+        "calidad": config["COMPROBANTE_CALIDAD"],
+        "guardar_original": config["COMPROBANTE_GUARDAR_ORIGINAL"],
+    }
+
+
+def ruta_original(uploads_dir, filename):
+    base, ext = os.path.splitext(filename)
+    return os.path.join(uploads_dir, base + ".orig" + ext)
+
+
+def recodificar(path, max_lado, calidad, ext=None):
+    """Reescala al lado máximo y recomprime in place, solo si ahorra al menos AHORRO_MINIMO.
+
+    Devuelve (bytes_antes, bytes_despues).
+    """
+    from PIL import Image, ImageOps
+
+    ext = ext or os.path.splitext(path)[1].lower()
+    formato = RECODIFICABLES[ext]
+    antes = os.path.getsize(path)
+
+    with Image.open(path) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_lado, max_lado))
+        if formato == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+        with os.fdopen(fd, "wb") as out:
+            if formato == "JPEG":
+                img.save(out, formato, quality=calidad, optimize=True, progressive=True)
+            else:
+                img.save(out, formato, optimize=True)
+
+    despues = os.path.getsize(tmp)
+    if despues <= antes * (1 - AHORRO_MINIMO):
+        _publicar(tmp, path)
+        return antes, despues
+
+    os.remove(tmp)
+    return antes, antes
+
+
+def _sha256_archivo(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def recomprimir_guardado(uploads_dir, filename, max_lado, calidad):
+    """Recomprime un comprobante ya guardado y lo publica con el nombre (sha) del resultado.
+
+    El archivo viejo no se toca: se sirve como immutable con ETag = su sha, así que los
+    bytes nuevos necesitan otro nombre. Lo borra el caller cuando ya no lo referencia la
+    base (borrar_guardado). Genera también la miniatura del nuevo.
+    Devuelve (filename_nuevo, bytes_antes, bytes_despues); filename_nuevo es None si no
+    se ahorró lo suficiente.
+    """
+    ext = os.path.splitext(filename)[1].lower()
+    ext = ".jpg" if ext == ".jpeg" else ext
+
+    fd, tmp = tempfile.mkstemp(dir=uploads_dir, suffix=".part")
+    os.close(fd)
+    try:
+        shutil.copyfile(os.path.join(uploads_dir, filename), tmp)
+        antes, despues = recodificar(tmp, max_lado, calidad, ext)
+        if despues >= antes:
+            os.remove(tmp)
+            return None, antes, antes
+
+        nuevo = _publicar_por_contenido(tmp, uploads_dir, ext)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    generar_miniatura(uploads_dir, nuevo)
+    return nuevo, antes, despues
+
+
+def borrar_guardado(uploads_dir, filename):
+    """Borra un comprobante y sus miniaturas (si existen)."""
+    for sufijo in ("", ".thumb.webp", ".thumb.jpg"):
+        try:
+            os.remove(os.path.join(uploads_dir, filename + sufijo))
+        except FileNotFoundError:
+            pass
+
+
+# ---------- MINIATURAS ----------
+def _formato_miniatura():
+    from PIL import features
+    return ("WEBP", ".thumb.webp") if features.check("webp") else ("JPEG", ".thumb.jpg")
+
+
+def ruta_miniatura(uploads_dir, filename):
+    _, sufijo = _formato_miniatura()
+    return os.path.join(uploads_dir, filename + sufijo)
+
+
+def _abrir_pdf(path):
+    # Primera página del PDF; solo si PyMuPDF está instalado (opcional)
+    try:
+        import fitz
+    except ImportError:
+        return None
+    from PIL import Image
+
+    with fitz.open(path) as doc:
+        if not doc.page_count:
+            return None
+        pix = doc[0].get_pixmap(matrix=fitz.Matrix(0.5, 0.5))
+        return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+
+def generar_miniatura(uploads_dir, filename):
+    """Crea la miniatura junto al original. Devuelve el path o None si no se puede."""
+    from PIL import Image, ImageOps
+
+    destino = ruta_miniatura(uploads_dir, filename)
+    if os.path.exists(destino):
+        return destino
+
+    origen = os.path.join(uploads_dir, filename)
+    if filename.lower().endswith(".pdf"):
+        img = _abrir_pdf(origen)
+        if img is None:
+            return None
+    else:
+        # exif_transpose devuelve una copia: el archivo se cierra al salir del with
+        with Image.open(origen) as original:
+            img = ImageOps.exif_transpose(original)
+
+    formato, _ = _formato_miniatura()
+    img.thumbnail((MINIATURA_LADO, MINIATURA_LADO))
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    fd, tmp = tempfile.mkstemp(dir=uploads_dir, suffix=".part")
+    with os.fdopen(fd, "wb") as out:
+        img.save(out, formato, quality=MINIATURA_CALIDAD)
+    _publicar(tmp, destino)
+    return destino
@@ -0,0 +1,69 @@
+import sqlalchemy as sa
+
+# Tablas como estaban antes de la primera migración (7d9f1a9de246): la cadena de Alembic
+# arranca agregando columnas a estas tablas, que en su momento creaba db.create_all() al
+# iniciar. Copia congelada: no seguir a app/models.py, eso lo hacen las migraciones.
+#
+# `flask seed` las crea en una base vacía y después corre `flask db upgrade`. Una base con
+# tablas pero sin alembic_version (creada por versiones viejas) no pasa por acá: hay que
+# marcarla a mano con `flask db stamp <revisión>` según las columnas que tenga y migrar.
+metadata = sa.MetaData()
+
+sa.Table("user", metadata,
+    sa.Column("id", sa.Integer(), primary_key=True),
+    sa.Column("username", sa.String(length=80), nullable=False, unique=True),
+    sa.Column("password_hash", sa.String(length=255), nullable=False),
+)
+sa.Table("producto", metadata,
+    sa.Column("id", sa.Integer(), primary_key=True),
+    sa.Column("nombre", sa.String(length=100)),
+    sa.Column("material", sa.String(length=100)),
+    sa.Column("precio", sa.Float()),
+    sa.Column("por_metro", sa.Boolean()),
+)
+sa.Table("precio_por_metro", metadata,
+    sa.Column("id", sa.Integer(), primary_key=True),
+    sa.Column("material", sa.String(length=120), nullable=False, unique=True),
+    sa.Column("precio", sa.Float(), nullable=False),
+)
+sa.Table("pedido", metadata,
+    sa.Column("id", sa.Integer(), primary_key=True),
+    sa.Column("cliente", sa.String(length=150), nullable=False),
+    sa.Column("telefono", sa.String(length=50)),
+    sa.Column("direccion", sa.String(length=200)),
+    sa.Column("observaciones", sa.Text()),
+    sa.Column("total", sa.Float(), nullable=False),
+    sa.Column("estado", sa.String(length=20)),
+    sa.Column("created_at", sa.DateTime()),
+)
+sa.Table("pedido_item", metadata,
+    sa.Column("id", sa.Integer(), primary_key=True),
+    sa.Column("pedido_id", sa.Integer(), sa.ForeignKey("pedido.id"), nullable=False),
+    sa.Column("descripcion", sa.String(length=255), nullable=False),
+    sa.Column("cantidad", sa.Integer(), nullable=False),
+    sa.Column("metros", sa.Float()),
+    sa.Column("subtotal", sa.Float(), nullable=False),
+)
+sa.Table("pago", metadata,
+    sa.Column("id", sa.Integer(), primary_key=True),
+    sa.Column("pedido_id", sa.Integer(), sa.ForeignKey("pedido.id"), nullable=False),
+    sa.Column("metodo", sa.String(length=50), nullable=False),
+    sa.Column("monto_pagado", sa.Float(), nullable=False),
+    sa.Column("cuotas", sa.Integer()),
+    sa.Column("monto_cuota", sa.Float()),
+    sa.Column("fecha_pago", sa.Date(), nullable=False),
+    sa.Column("created_at", sa.DateTime(), nullable=False),
+)
+sa.Table("pago_comprobante", metadata,
+    sa.Column("id", sa.Integer(), primary_key=True),
+    sa.Column("pago_id", sa.Integer(), sa.ForeignKey("pago.id"), nullable=False),
+    sa.Column("filename", sa.String(length=255), nullable=False),
+    sa.Column("original_name", sa.String(length=255), nullable=False),
+    sa.Column("mimetype", sa.String(length=120)),
+    sa.Column("uploaded_at", sa.DateTime(), nullable=False),
+)
+
+
+def crear(bind):
+    """Crea las tablas base que falten (idempotente)."""
+    metadata.create_all(bind, checkfirst=True)
@@ -0,0 +1,189 @@
+from threading import Lock
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from . import db
+from .models import Pedido, VentaDiaria
+
+ESTADOS = ["PENDIENTE", "EN_CURSO", "FINALIZADO"]
+RANGOS_DIAS = [7, 30, 90, 365]
+
+# Cache en memoria del proceso: se invalida en cada escritura de pedidos
+_cache = {}
+_lock = Lock()
+_generacion = 0
+
+
+def invalidar():
+    global _generacion
+    with _lock:
+        _generacion += 1
+        _cache.clear()
+
+
+# ---------- ROLLUP venta_diaria ----------
+def registrar_delta(fecha, estado, activo, cantidad, total):
+    # Suma (o resta) un delta al bucket del día; no hace commit, va en la transacción del pedido
+    dialecto = db.session.get_bind().dialect.name
+    if dialecto in ("sqlite", "postgresql"):
+        if dialecto == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+
+        stmt = insert(VentaDiaria).values(
+            fecha=fecha, estado=estado, activo=activo, cantidad=cantidad, total=total
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["fecha", "estado", "activo"],
+            set_={
+                "cantidad": VentaDiaria.cantidad + stmt.excluded.cantidad,
+                "total": VentaDiaria.total + stmt.excluded.total,
+            },
+        )
+        db.session.execute(stmt)
+        return
+
+    fila = VentaDiaria.query.filter_by(fecha=fecha, estado=estado, activo=activo).first()
+    if fila is None:
+        fila = VentaDiaria(fecha=fecha, estado=estado, activo=activo, cantidad=0, total=0.0)
+        db.session.add(fila)
+    fila.cantidad = (fila.cantidad or 0) + cantidad
+    fila.total = (fila.total or 0.0) + total
+
+
+def registrar_alta(pedido):
+    registrar_delta(pedido.created_at.date(), pedido.estado, bool(pedido.activo), 1, float(pedido.total or 0.0))
+
+
+def registrar_baja(pedido):
+    registrar_delta(pedido.created_at.date(), pedido.estado, bool(pedido.activo), -1, -float(pedido.total or 0.0))
+
+
+def registrar_cambio(pedido, estado_anterior, activo_anterior):
+    total = float(pedido.total or 0.0)
+    fecha = pedido.created_at.date()
+    registrar_delta(fecha, estado_anterior, bool(activo_anterior), -1, -total)
+    registrar_delta(fecha, pedido.estado, bool(pedido.activo), 1, total)
+
+
+def reconstruir_rollup():
+    # Recalcula venta_diaria completa desde pedido (CLI / reparación)
+    dia = func.date(Pedido.created_at)
+    filas = (
+        db.session.query(
+            dia,
+            Pedido.estado,
+            Pedido.activo,
+            func.count(Pedido.id),
+            func.coalesce(func.sum(Pedido.total), 0.0)
+        )
+        .group_by(dia, Pedido.estado, Pedido.activo)
+        .all()
+    )
+
+    VentaDiaria.query.delete()
+    for d, estado, activo, cant, total in filas:
+        db.session.add(VentaDiaria(
+            fecha=datetime.strptime(str(d), "%Y-%m-%d").date(),
+            estado=estado,
+            activo=bool(activo),
+            cantidad=int(cant),
+            total=float(total),
+        ))
+    db.session.commit()
+    invalidar()
+    return len(filas)
+
+
+# ---------- CONSULTAS ----------
+def _calcular_por_estado():
+    # Un solo GROUP BY para cantidades y totales de todos los estados
+    filas = (
+        db.session.query(
+            Pedido.estado,
+            func.count(Pedido.id),
+            func.coalesce(func.sum(Pedido.total), 0.0)
+        )
+        .filter(Pedido.activo == True)
+        .group_by(Pedido.estado)
+        .all()
+    )
+
+    cantidades = {e: 0 for e in ESTADOS}
+    totales = {e: 0.0 for e in ESTADOS}
+    for estado, cant, total in filas:
+        cantidades[estado] = int(cant)
+        totales[estado] = float(total)
+
+    return cantidades, totales
+
+
+def _calcular_serie(hoy, dias, agrupar):
+    desde = hoy - timedelta(days=dias - 1)
+
+    # Lee del rollup: O(días) filas en lugar de recorrer todos los pedidos
+    filas = (
+        db.session.query(
+            VentaDiaria.fecha,
+            func.sum(VentaDiaria.cantidad),
+            func.sum(VentaDiaria.total)
+        )
+        .filter(VentaDiaria.activo == True, VentaDiaria.fecha >= desde)
+        .group_by(VentaDiaria.fecha)
+        .all()
+    )
+    por_dia = {f: (int(c or 0), float(t or 0.0)) for f, c, t in filas}
+
+    fechas = [desde + timedelta(days=i) for i in range(dias)]
+
+    if agrupar == "mes":
+        meses = {}
+        for d in fechas:
+            c, t = por_dia.get(d, (0, 0.0))
+            acum = meses.setdefault((d.year, d.month), [0, 0.0])
+            acum[0] += c
+            acum[1] += t
+        return {
+            "labels": [f"{m:02d}/{y}" for (y, m) in meses],
+            "totales": [v[1] for v in meses.values()],
+            "cantidades": [v[0] for v in meses.values()],
+        }
+
+    return {
+        "labels": [d.strftime("%d/%m") for d in fechas],
+        "totales": [por_dia.get(d, (0, 0.0))[1] for d in fechas],
+        "cantidades": [por_dia.get(d, (0, 0.0))[0] for d in fechas],
+    }
+
+
+def _cacheado(clave, calcular):
+    with _lock:
+        if clave in _cache:
+            return _cache[clave]
+        generacion = _generacion
+
+    valor = calcular()
+
+    # Si hubo una escritura mientras calculábamos, no guardamos un resultado viejo
+    with _lock:
+        if generacion == _generacion:
+            _cache[clave] = valor
+    return valor
+
+
+def serie_ventas(dias=7, agrupar="dia"):
+    hoy = datetime.utcnow().date()
+    return _cacheado(("serie", hoy, dias, agrupar), lambda: _calcular_serie(hoy, dias, agrupar))
+
+
+def resumen_dashboard(dias=7):
+    def calcular():
+        cantidades, totales = _calcular_por_estado()
+        return {
+            "cantidades": cantidades,
+            "totales": totales,
+            "total_pedidos": sum(cantidades.values()),
+            "serie": serie_ventas(dias),
+        }
+
+    return _cacheado(("resumen", datetime.utcnow().date(), dias), calcular)
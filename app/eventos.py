@@ -0,0 +1,110 @@
+import json
+import time
+import uuid
+from collections import deque
+from threading import Condition
+
+# Eventos de pedidos para tableros abiertos (SSE / long-poll). En memoria del proceso:
+# al reiniciar cambia la época y los clientes recargan la página.
+EPOCA = uuid.uuid4().hex[:8]
+BUFFER = 1000
+
+_cond = Condition()
+_eventos = deque(maxlen=BUFFER)
+_seq = 0
+_cerrando = False
+_esperando = 0
+
+
+def publicar(tipo, **datos):
+    """Publica un evento; llamar después del commit."""
+    global _seq
+    with _cond:
+        _seq += 1
+        _eventos.append({"seq": _seq, "tipo": tipo, **datos})
+        _cond.notify_all()
+
+
+def cerrar():
+    """Despierta a todos los que esperan y corta los streams (apagado del servidor)."""
+    global _cerrando
+    with _cond:
+        _cerrando = True
+        _cond.notify_all()
+
+
+def reservar(maximo):
+    """Toma un lugar para un SSE o long-poll; False si ya hay `maximo` esperando.
+
+    Cada uno ocupa un hilo del servidor mientras espera: sin límite, unos pocos
+    tableros abiertos dejan sin hilos a los requests normales.
+    """
+    global _esperando
+    with _cond:
+        if _esperando >= maximo:
+            return False
+        _esperando += 1
+        return True
+
+
+def liberar():
+    global _esperando
+    with _cond:
+        _esperando -= 1
+
+
+def cursor_actual():
+    return f"{EPOCA}:{_seq}"
+
+
+def _parsear(cursor):
+    # None = el cliente no sigue esta época (reinicio) o se quedó afuera del buffer
+    try:
+        epoca, seq = (cursor or "").split(":")
+        seq = int(seq)
+    except ValueError:
+        return None
+    if epoca != EPOCA or seq > _seq:
+        return None
+    if _eventos and seq < _eventos[0]["seq"] - 1:
+        return None
+    return seq
+
+
+def esperar(cursor, timeout):
+    """Eventos posteriores a `cursor`, esperando hasta `timeout` segundos si no hay.
+
+    Devuelve (eventos, cursor_nuevo); eventos es None si el cliente tiene que recargar.
+    """
+    limite = time.monotonic() + timeout
+    with _cond:
+        seq = _parsear(cursor)
+        if seq is None:
+            return None, cursor_actual()
+
+        while _seq == seq and not _cerrando:
+            resto = limite - time.monotonic()
+            if resto <= 0:
+                break
+            _cond.wait(resto)
+
+        nuevos = [e for e in _eventos if e["seq"] > seq]
+        return nuevos, cursor_actual()
+
+
+def stream_sse(cursor, duracion, latido=15):
+    """Generador SSE. Corta a los `duracion` segundos (el navegador reconecta solo con
+    Last-Event-ID) para no dejar hilos del servidor tomados para siempre."""
+    fin = time.monotonic() + duracion
+    yield "retry: 2000\n\n"
+
+    while time.monotonic() < fin and not _cerrando:
+        eventos, cursor = esperar(cursor, min(latido, max(fin - time.monotonic(), 0)))
+        if eventos is None:
+            yield f"id: {cursor}\nevent: recargar\ndata: {{}}\n\n"
+            return
+        if not eventos:
+            yield ": latido\n\n"
+            continue
+        for e in eventos:
+            yield f"id: {EPOCA}:{e['seq']}\nevent: {e['tipo']}\ndata: {json.dumps(e)}\n\n"
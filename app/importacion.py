@@ -0,0 +1,204 @@
+import csv
+import io
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import insert
+from . import db, estadisticas, clientes
+from .models import Pedido, PedidoItem, Pago, siguiente_cambio
+
+ESTADOS = estadisticas.ESTADOS
+METODOS_PAGO = ["Efectivo", "Transferencia", "Tarjeta", "MercadoPago"]
+
+# Cuántas filas por INSERT ... VALUES (SQLite limita la cantidad de parámetros)
+LOTE = 500
+
+
+def _texto(v):
+    v = (str(v) if v is not None else "").strip()
+    return v or None
+
+
+def _float(v, campo, n, requerido=False):
+    v = _texto(v)
+    if v is None:
+        if requerido:
+            raise ValueError(f"pedido {n}: {campo} requerido")
+        return None
+    try:
+        return float(v.replace(",", "."))
+    except ValueError:
+        raise ValueError(f"pedido {n}: {campo} inválido")
+
+
+def _fecha(v, campo, n):
+    v = _texto(v)
+    if v is None:
+        return None
+    for fmt in ("%Y-%m-%d", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S"):
+        try:
+            return datetime.strptime(v, fmt)
+        except ValueError:
+            pass
+    raise ValueError(f"pedido {n}: {campo} inválida")
+
+
+def leer_csv(contenido):
+    # Una fila por item; las filas con la misma columna "pedido" forman un pedido.
+    # Columnas de pago (pago_metodo, pago_monto, pago_fecha) opcionales en cualquier fila.
+    lector = csv.DictReader(io.StringIO(contenido))
+    pedidos = {}
+    for idx, fila in enumerate(lector, start=1):
+        ref = _texto(fila.get("pedido")) or f"fila-{idx}"
+        p = pedidos.setdefault(ref, {
+            "cliente": fila.get("cliente"),
+            "telefono": fila.get("telefono"),
+            "direccion": fila.get("direccion"),
+            "email": fila.get("email"),
+            "observaciones": fila.get("observaciones"),
+            "estado": fila.get("estado"),
+            "fecha": fila.get("fecha"),
+            "monto_sena": fila.get("monto_sena"),
+            "forma_pago": fila.get("forma_pago"),
+            "items": [],
+            "pagos": [],
+        })
+        if _texto(fila.get("descripcion")):
+            p["items"].append({
+                "descripcion": fila.get("descripcion"),
+                "cantidad": fila.get("cantidad"),
+                "metros": fila.get("metros"),
+                "subtotal": fila.get("subtotal"),
+            })
+        if _texto(fila.get("pago_monto")):
+            p["pagos"].append({
+                "metodo": fila.get("pago_metodo"),
+                "monto_pagado": fila.get("pago_monto"),
+                "fecha_pago": fila.get("pago_fecha"),
+                "cuotas": fila.get("pago_cuotas"),
+                "monto_cuota": fila.get("pago_monto_cuota"),
+            })
+    return list(pedidos.values())
+
+
+def _normalizar(reg, n):
+    cliente = _texto(reg.get("cliente"))
+    if not cliente:
+        raise ValueError(f"pedido {n}: cliente requerido")
+
+    estado = (_texto(reg.get("estado")) or "PENDIENTE").upper()
+    if estado not in ESTADOS:
+        raise ValueError(f"pedido {n}: estado inválido")
+
+    creado = _fecha(reg.get("fecha") or reg.get("created_at"), "fecha", n) or datetime.utcnow()
+
+    items = []
+    for it in reg.get("items") or []:
+        descripcion = _texto(it.get("descripcion"))
+        if not descripcion:
+            raise ValueError(f"pedido {n}: item sin descripción")
+        cantidad = _float(it.get("cantidad"), "cantidad", n) or 1
+        items.append({
+            "descripcion": descripcion,
+            "cantidad": int(cantidad),
+            "metros": _float(it.get("metros"), "metros", n),
+            "subtotal": _float(it.get("subtotal"), "subtotal", n) or 0.0,
+        })
+
+    pagos = []
+    for pay in reg.get("pagos") or []:
+        metodo = _texto(pay.get("metodo"))
+        if metodo not in METODOS_PAGO:
+            raise ValueError(f"pedido {n}: metodo de pago inválido")
+        fecha_pago = _fecha(pay.get("fecha_pago"), "fecha_pago", n) or creado
+        cuotas = _float(pay.get("cuotas"), "cuotas", n)
+        pagos.append({
+            "metodo": metodo,
+            "monto_pagado": _float(pay.get("monto_pagado"), "monto_pagado", n, requerido=True),
+            "fecha_pago": fecha_pago.date(),
+            "cuotas": int(cuotas) if cuotas else None,
+            "monto_cuota": _float(pay.get("monto_cuota"), "monto_cuota", n),
+        })
+
+    total = _float(reg.get("total"), "total", n)
+    if total is None:
+        total = sum(it["subtotal"] for it in items)
+
+    monto_sena = _float(reg.get("monto_sena"), "monto_sena", n)
+    total_pagado = sum(pay["monto_pagado"] for pay in pagos)
+
+    pedido = {
+        "cliente": cliente,
+        "telefono": _texto(reg.get("telefono")),
+        "direccion": _texto(reg.get("direccion")),
+        "email": _texto(reg.get("email")),
+        "observaciones": _texto(reg.get("observaciones")),
+        "total": total,
+        "estado": estado,
+        "created_at": creado,
+        "pendiente_at": creado,
+        "en_curso_at": creado if estado in ("EN_CURSO", "FINALIZADO") else None,
+        "finalizado_at": creado if estado == "FINALIZADO" else None,
+        "monto_sena": monto_sena,
+        "total_pagado": total_pagado,
+        "saldo": total - (monto_sena or 0.0) - total_pagado,
+        "forma_pago_preferida": _texto(reg.get("forma_pago")),
+        "activo": True,
+    }
+    return pedido, items, pagos
+
+
+def _insertar_lotes(modelo, filas, returning=None):
+    ids = []
+    for i in range(0, len(filas), LOTE):
+        lote = filas[i:i + LOTE]
+        if returning is not None:
+            stmt = insert(modelo).returning(returning, sort_by_parameter_order=True)
+            ids.extend(db.session.execute(stmt, lote).scalars().all())
+        elif lote:
+            db.session.execute(insert(modelo), lote)
+    return ids
+
+
+def importar_pedidos(registros):
+    """Crea pedidos con sus items y pagos en una sola transacción (INSERTs por lote).
+
+    Si algún registro es inválido no se guarda nada y se lanza ValueError.
+    """
+    normalizados = [_normalizar(reg, n) for n, reg in enumerate(registros, start=1)]
+    if not normalizados:
+        return 0
+
+    try:
+        # Un valor de la secuencia de cambios por pedido, reservados de una vez
+        primero = siguiente_cambio(len(normalizados)) - len(normalizados) + 1
+        for i, (pedido, _, _) in enumerate(normalizados):
+            pedido["cambio"] = primero + i
+
+        clientes.vincular_lote([p for p, _, _ in normalizados])
+        pedido_ids = _insertar_lotes(Pedido, [p for p, _, _ in normalizados], returning=Pedido.id)
+
+        items = []
+        pagos = []
+        rollup = defaultdict(lambda: [0, 0.0])
+        for pid, (pedido, its, pays) in zip(pedido_ids, normalizados):
+            items.extend({**it, "pedido_id": pid} for it in its)
+            pagos.extend({**pay, "pedido_id": pid} for pay in pays)
+
+            bucket = rollup[(pedido["created_at"].date(), pedido["estado"])]
+            bucket[0] += 1
+            bucket[1] += pedido["total"]
+
+        _insertar_lotes(PedidoItem, items)
+        _insertar_lotes(Pago, pagos)
+
+        # venta_diaria: un delta por (día, estado), no uno por pedido
+        for (fecha, estado), (cant, total) in rollup.items():
+            estadisticas.registrar_delta(fecha, estado, True, cant, total)
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    estadisticas.invalidar()
+    return len(pedido_ids)
@@ -33,13 +33,68 @@ class PrecioPorMetro(db.Model):
     material = db.Column(db.String(120), unique=True, nullable=False)
     precio = db.Column(db.Float, nullable=False)
 
+class PrecioHistorial(db.Model):
+    # Un registro por cambio de precio (alta: anterior None, baja: nuevo None)
+    __tablename__ = "precio_historial"
+    __table_args__ = (
+        db.Index("ix_precio_historial_material_fecha", "material", "cambiado_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    material = db.Column(db.String(120), nullable=False)
+    precio_anterior = db.Column(db.Float, nullable=True)
+    precio_nuevo = db.Column(db.Float, nullable=True)
+    cambiado_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class Cliente(db.Model):
+    # Un cliente por teléfono normalizado (ver app/clientes.py); los *_normalizado
+    # son para búsquedas por prefijo con índice (rango >= / <)
+    __table_args__ = (
+        db.Index("ux_cliente_telefono_normalizado", "telefono_normalizado", unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    nombre = db.Column(db.String(150), nullable=False)
+    nombre_normalizado = db.Column(db.String(150), nullable=False, index=True)
+    telefono = db.Column(db.String(50), nullable=True)
+    telefono_normalizado = db.Column(db.String(30), nullable=True)
+    direccion = db.Column(db.String(200), nullable=True)
+    email = db.Column(db.String(120), nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    pedidos = db.relationship("Pedido", back_populates="cliente_ref")
+
 class Pedido(db.Model):
+    # Índices parciales sobre activos: todas las lecturas filtran activo == True
+    __table_args__ = (
+        db.Index(
+            "ix_pedido_activos_estado_id", "estado", "id",
+            sqlite_where=db.text("activo = 1"), postgresql_where=db.text("activo")
+        ),
+        db.Index(
+            "ix_pedido_activos_id", "id",
+            sqlite_where=db.text("activo = 1"), postgresql_where=db.text("activo")
+        ),
+        db.Index(
+            "ix_pedido_activos_created_at", "created_at",
+            sqlite_where=db.text("activo = 1"), postgresql_where=db.text("activo")
+        ),
+        db.Index(
+            "ix_pedido_activos_saldo_id", "saldo", "id",
+            sqlite_where=db.text("activo = 1"), postgresql_where=db.text("activo")
+        ),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
 
+    # Copia de los datos del cliente al momento del pedido + vínculo al Cliente (por teléfono)
     cliente = db.Column(db.String(150), nullable=False)
     telefono = db.Column(db.String(50))
     direccion = db.Column(db.String(200))
     email = db.Column(db.String(120))
+    cliente_id = db.Column(db.Integer, db.ForeignKey("cliente.id"), nullable=True, index=True)
 
     observaciones = db.Column(db.Text)
 
@@ -56,11 +111,22 @@ class Pedido(db.Model):
     # Seña: con esto alcanza (si es None o 0 → no hay seña)
     monto_sena = db.Column(db.Float, nullable=True)
 
+    # Desnormalizado: suma de Pago.monto_pagado y lo que falta cobrar (total - seña - pagado).
+    # Se actualiza en la misma transacción que crea/borra pagos (ver `flask reconciliar-saldos`)
+    total_pagado = db.Column(db.Float, nullable=False, default=0.0, server_default="0")
+    saldo = db.Column(db.Float, nullable=False, default=0.0, server_default="0")
+
     # Opcional: si querés guardar la "preferencia" cuando creás el pedido
     forma_pago_preferida = db.Column(db.String(50), nullable=True)
 
     activo = db.Column(db.Boolean, nullable=False, default=True)
 
+    # Valor de la secuencia global de cambios en la última escritura del pedido o de sus
+    # pagos (sync por ?since= y ETag del detalle)
+    cambio = db.Column(db.Integer, nullable=False, default=0, server_default="0", index=True)
+
+    cliente_ref = db.relationship("Cliente", back_populates="pedidos")
+
     items = db.relationship(
         "PedidoItem",
         back_populates="pedido",
@@ -73,13 +139,22 @@ class Pedido(db.Model):
         cascade="all, delete-orphan"
     )
 
+    def registrar_pago(self, monto):
+        # Incrementos en SQL: dos pagos concurrentes no se pisan
+        self.total_pagado = Pedido.total_pagado + monto
+        self.saldo = Pedido.saldo - monto
+
+    def marcar_cambio(self):
+        self.cambio = siguiente_cambio()
+
 class PedidoItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
     pedido_id = db.Column(
         db.Integer,
         db.ForeignKey("pedido.id"),
-        nullable=False
+        nullable=False,
+        index=True
     )
 
     descripcion = db.Column(db.String(255), nullable=False)
@@ -95,7 +170,7 @@ class PedidoItem(db.Model):
 class Pago(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
-    pedido_id = db.Column(db.Integer, db.ForeignKey("pedido.id"), nullable=False)
+    pedido_id = db.Column(db.Integer, db.ForeignKey("pedido.id"), nullable=False, index=True)
 
     # Efectivo / Transferencia / Tarjeta / MercadoPago
     metodo = db.Column(db.String(50), nullable=False)
@@ -121,7 +196,7 @@ class Pago(db.Model):
 class PagoComprobante(db.Model):
     id = db.Column(db.Integer, primary_key=True)
 
-    pago_id = db.Column(db.Integer, db.ForeignKey("pago.id"), nullable=False)
+    pago_id = db.Column(db.Integer, db.ForeignKey("pago.id"), nullable=False, index=True)
 
     filename = db.Column(db.String(255), nullable=False)       # nombre guardado
     original_name = db.Column(db.String(255), nullable=False)  # nombre original
@@ -130,4 +205,78 @@ class PagoComprobante(db.Model):
 
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
-    pago = db.relationship("Pago", back_populates="comprobantes")
\ No newline at end of file
+    pago = db.relationship("Pago", back_populates="comprobantes")
+
+class VentaDiaria(db.Model):
+    # Rollup por día de creación del pedido; se mantiene en la misma transacción que los pedidos
+    __tablename__ = "venta_diaria"
+    __table_args__ = (
+        db.UniqueConstraint("fecha", "estado", "activo", name="uq_venta_diaria_fecha_estado_activo"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+
+    fecha = db.Column(db.Date, nullable=False)
+    estado = db.Column(db.String(20), nullable=False)
+    activo = db.Column(db.Boolean, nullable=False, default=True)
+
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+
+class Secuencia(db.Model):
+    # Contadores globales; "cambios" ordena todas las escrituras de pedidos
+    nombre = db.Column(db.String(50), primary_key=True)
+    valor = db.Column(db.Integer, nullable=False, default=0)
+
+
+def siguiente_cambio(n=1):
+    """Reserva n valores de la secuencia de cambios y devuelve el último.
+
+    El UPDATE toma el lock de escritura: las transacciones quedan ordenadas.
+    """
+    return db.session.execute(
+        db.update(Secuencia)
+        .where(Secuencia.nombre == "cambios")
+        .values(valor=Secuencia.valor + n)
+        .returning(Secuencia.valor)
+    ).scalar_one()
+
+
+def cambio_actual():
+    return db.session.query(Secuencia.valor).filter(Secuencia.nombre == "cambios").scalar() or 0
+
+
+class PedidoBorrado(db.Model):
+    # Lápida de un pedido borrado físicamente, para que los clientes en sync lo quiten
+    __tablename__ = "pedido_borrado"
+
+    pedido_id = db.Column(db.Integer, primary_key=True)
+    cambio = db.Column(db.Integer, nullable=False, index=True)
+    borrado_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+class Trabajo(db.Model):
+    # Cola persistente de tareas lentas (ver app/trabajos.py); sobrevive reinicios
+    __tablename__ = "trabajo"
+    __table_args__ = (
+        db.Index("ix_trabajo_estado_disponible", "estado", "disponible_at"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    tipo = db.Column(db.String(50), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default="{}")      # JSON
+
+    # pendiente / corriendo / hecho / fallido
+    estado = db.Column(db.String(20), nullable=False, default="pendiente")
+    intentos = db.Column(db.Integer, nullable=False, default=0)
+    max_intentos = db.Column(db.Integer, nullable=False, default=3)
+
+    # No se toma antes de esta hora (reintentos con espera); si está "corriendo"
+    # y se pasó, el worker que lo tenía se murió y se vuelve a tomar
+    disponible_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    resultado = db.Column(db.Text, nullable=True)                   # JSON
+    error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    iniciado_at = db.Column(db.DateTime, nullable=True)
+    terminado_at = db.Column(db.DateTime, nullable=True)
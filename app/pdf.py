@@ -0,0 +1,262 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zipfile
+from datetime import datetime, timedelta
+from threading import Lock
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+import multiprocessing
+from sqlalchemy.orm import selectinload
+from .models import Pedido
+from .estadisticas import ESTADOS
+
+# Pedidos por consulta al exportar (memoria acotada sin importar cuántos haya)
+LOTE_EXPORTACION = 100
+
+
+def datos_pedido(p):
+    # Snapshot plano (picklable) de lo que se imprime: los workers no tocan la DB
+    return {
+        "id": p.id,
+        "cliente": p.cliente,
+        "telefono": p.telefono,
+        "direccion": p.direccion,
+        "estado": p.estado,
+        "observaciones": p.observaciones,
+        "total": float(p.total or 0.0),
+        "items": [
+            {"descripcion": it.descripcion, "cantidad": it.cantidad, "subtotal": float(it.subtotal or 0.0)}
+            for it in p.items
+        ],
+    }
+
+
+def render_pedido_pdf(d):
+    from reportlab.pdfgen import canvas
+    from reportlab.lib.pagesizes import A4
+
+    buffer = BytesIO()
+    c = canvas.Canvas(buffer, pagesize=A4)
+    w, h = A4
+
+    y = h - 50
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(50, y, "Comprobante de Pedido")
+    y -= 25
+
+    c.setFont("Helvetica", 11)
+    c.drawString(50, y, f"Pedido: #{d['id']}")
+    y -= 16
+    c.drawString(50, y, f"Cliente: {d['cliente']}")
+    y -= 16
+    c.drawString(50, y, f"Teléfono: {d['telefono']}")
+    y -= 16
+    c.drawString(50, y, f"Dirección: {d['direccion']}")
+    y -= 16
+    c.drawString(50, y, f"Estado: {d['estado']}")
+    y -= 22
+
+    if d["observaciones"]:
+        c.setFont("Helvetica-Bold", 11)
+        c.drawString(50, y, "Observaciones:")
+        y -= 16
+        c.setFont("Helvetica", 11)
+        # simple wrap
+        text = c.beginText(50, y)
+        for line in str(d["observaciones"]).splitlines():
+            text.textLine(line)
+        c.drawText(text)
+        y = text.getY() - 10
+
+    c.setFont("Helvetica-Bold", 12)
+    c.drawString(50, y, "Detalle:")
+    y -= 18
+
+    c.setFont("Helvetica", 11)
+    for it in d["items"]:
+        linea = f"- {it['descripcion']} | Cant: {it['cantidad']} | Subtotal: ${it['subtotal']:.2f}"
+        c.drawString(55, y, linea[:110])
+        y -= 14
+        if y < 80:
+            c.showPage()
+            y = h - 50
+
+    y -= 10
+    c.setFont("Helvetica-Bold", 14)
+    c.drawString(50, y, f"TOTAL: ${d['total']:.2f}")
+
+    c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def _render_con_nombre(d):
+    return f"pedido_{d['id']}.pdf", render_pedido_pdf(d)
+
+
+# ---------- CACHE EN DISCO ----------
+_lock_cache = Lock()
+
+
+def clave_cache(d):
+    # Hash del contenido impreso: si cambia algo del pedido cambia la clave
+    return hashlib.sha256(json.dumps(d, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _evictar(cache_dir, max_bytes):
+    # LRU por atime (se marca en cada hit) hasta quedar bajo el límite. El mtime no se
+    # toca: es el Last-Modified que se sirve.
+    archivos = []
+    total = 0
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name.endswith(".pdf"):
+            st = entry.stat()
+            archivos.append((st.st_atime, st.st_size, entry.path))
+            total += st.st_size
+
+    archivos.sort()
+    for _, size, path in archivos:
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass  # ya no estaba, o (Windows) se está enviando
+
+
+def pdf_cacheado(cache_dir, d, max_bytes):
+    """Devuelve (path, clave) del PDF del pedido, generándolo solo si no está en cache."""
+    clave = clave_cache(d)
+    path = os.path.join(cache_dir, f"pedido_{d['id']}_{clave[:16]}.pdf")
+
+    try:
+        st = os.stat(path)
+        os.utime(path, (time.time(), st.st_mtime))  # marca de uso para el LRU, mtime intacto
+        return path, clave
+    except FileNotFoundError:
+        pass
+
+    contenido = render_pedido_pdf(d)
+
+    with _lock_cache:
+        # Versiones anteriores de este pedido ya no sirven (el pedido cambió)
+        prefijo = f"pedido_{d['id']}_"
+        for entry in os.scandir(cache_dir):
+            if entry.name.startswith(prefijo) and entry.path != path:
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+        fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(contenido)
+        os.replace(tmp, path)
+
+        _evictar(cache_dir, max_bytes)
+
+    return path, clave
+
+
+def parsear_filtro(estado=None, desde=None, hasta=None, ids=None):
+    """Filtro de exportación desde texto (query string o payload de un trabajo).
+
+    desde/hasta: YYYY-MM-DD por fecha de creación (hasta inclusive); ids: "1,2,3".
+    Lanza ValueError si algo no se puede interpretar.
+    """
+    estado = (estado or "").upper() or None
+    if estado and estado not in ESTADOS:
+        raise ValueError("Estado inválido")
+    return {
+        "estado": estado,
+        "desde": datetime.strptime(desde, "%Y-%m-%d") if desde else None,
+        "hasta": datetime.strptime(hasta, "%Y-%m-%d") + timedelta(days=1) if hasta else None,
+        "ids": [int(x) for x in (ids or "").split(",") if x.strip()],
+    }
+
+
+def consulta_exportacion(estado=None, desde=None, hasta=None, ids=None):
+    query = Pedido.query.filter(Pedido.activo == True)
+    if estado:
+        query = query.filter(Pedido.estado == estado)
+    if desde:
+        query = query.filter(Pedido.created_at >= desde)
+    if hasta:
+        query = query.filter(Pedido.created_at < hasta)
+    if ids:
+        query = query.filter(Pedido.id.in_(ids))
+    return query
+
+
+def _iter_datos(query):
+    # Keyset por id: nunca hay más de LOTE_EXPORTACION pedidos cargados a la vez
+    ultimo = 0
+    while True:
+        lote = (
+            query.filter(Pedido.id > ultimo)
+            .options(selectinload(Pedido.items))
+            .order_by(Pedido.id.asc())
+            .limit(LOTE_EXPORTACION)
+            .all()
+        )
+        if not lote:
+            return
+        for p in lote:
+            yield datos_pedido(p)
+        ultimo = lote[-1].id
+
+
+class _SalidaStream:
+    # File-like de solo escritura: zipfile escribe acá y el generador va vaciando
+    def __init__(self):
+        self._partes = deque()
+        self._pos = 0
+
+    def write(self, data):
+        self._partes.append(bytes(data))
+        self._pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._pos
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        while self._partes:
+            yield self._partes.popleft()
+
+
+def zip_pdfs(query, workers=None):
+    """Genera (en chunks) un ZIP con un PDF por pedido de `query`.
+
+    Los PDFs se renderizan en paralelo en un pool de procesos; en vuelo hay como
+    mucho 2 por worker, así la memoria no crece con la cantidad de pedidos.
+    """
+    workers = workers or os.cpu_count() or 1
+    salida = _SalidaStream()
+    ctx = multiprocessing.get_context("spawn")
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool, \
+            zipfile.ZipFile(salida, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+        pendientes = deque()
+        for d in _iter_datos(query):
+            pendientes.append(pool.submit(_render_con_nombre, d))
+            if len(pendientes) >= workers * 2:
+                nombre, contenido = pendientes.popleft().result()
+                zf.writestr(nombre, contenido)
+                yield from salida.vaciar()
+
+        while pendientes:
+            nombre, contenido = pendientes.popleft().result()
+            zf.writestr(nombre, contenido)
+            yield from salida.vaciar()
+
+    # Directorio central del ZIP (se escribe al cerrar)
+    yield from salida.vaciar()
@@ -0,0 +1,68 @@
+from datetime import datetime
+from sqlalchemy import insert, update
+from . import db
+from .models import PrecioPorMetro, PrecioHistorial
+
+
+def guardar_precios(nuevos):
+    """Aplica {material: precio} contra precio_por_metro tocando solo lo que cambió.
+
+    Devuelve (altas, cambios, bajas). No hace commit.
+    """
+    actuales = {r.material: r for r in PrecioPorMetro.query.all()}
+    ahora = datetime.utcnow()
+
+    altas = [
+        {"material": m, "precio": p}
+        for m, p in nuevos.items() if m not in actuales
+    ]
+    cambios = [
+        (actuales[m], p)
+        for m, p in nuevos.items() if m in actuales and actuales[m].precio != p
+    ]
+    bajas = [r for m, r in actuales.items() if m not in nuevos]
+
+    historial = (
+        [{"material": a["material"], "precio_anterior": None, "precio_nuevo": a["precio"], "cambiado_at": ahora} for a in altas]
+        + [{"material": r.material, "precio_anterior": r.precio, "precio_nuevo": p, "cambiado_at": ahora} for r, p in cambios]
+        + [{"material": r.material, "precio_anterior": r.precio, "precio_nuevo": None, "cambiado_at": ahora} for r in bajas]
+    )
+
+    if bajas:
+        PrecioPorMetro.query.filter(
+            PrecioPorMetro.id.in_([r.id for r in bajas])
+        ).delete(synchronize_session=False)
+    if cambios:
+        db.session.execute(update(PrecioPorMetro), [{"id": r.id, "precio": p} for r, p in cambios])
+    if altas:
+        db.session.execute(insert(PrecioPorMetro), altas)
+    if historial:
+        db.session.execute(insert(PrecioHistorial), historial)
+
+    return len(altas), len(cambios), len(bajas)
+
+
+def precio_en(material, fecha):
+    """Precio por metro vigente para `material` en `fecha` (None si no existía)."""
+    ultimo = (
+        PrecioHistorial.query
+        .filter(PrecioHistorial.material == material, PrecioHistorial.cambiado_at <= fecha)
+        .order_by(PrecioHistorial.cambiado_at.desc(), PrecioHistorial.id.desc())
+        .first()
+    )
+    if ultimo is not None:
+        return ultimo.precio_nuevo
+
+    # Sin historial previo a esa fecha: el precio anterior al primer cambio registrado
+    # (None si el primer registro es el alta del material)
+    primero = (
+        PrecioHistorial.query
+        .filter(PrecioHistorial.material == material)
+        .order_by(PrecioHistorial.cambiado_at.asc(), PrecioHistorial.id.asc())
+        .first()
+    )
+    if primero is not None:
+        return primero.precio_anterior
+
+    actual = PrecioPorMetro.query.filter_by(material=material).first()
+    return actual.precio if actual else None
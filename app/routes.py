@@ -1,14 +1,74 @@
-from flask import render_template, request, redirect, url_for, flash, send_file
+from flask import render_template, request, redirect, url_for, flash, send_file, jsonify, make_response, abort
+from flask import Response, stream_with_context, send_from_directory
 from flask_login import login_required
 from . import db
-from .models import Producto, PrecioPorMetro, Pedido, PedidoItem, Pago, PagoComprobante
-from sqlalchemy import func
+from .models import Producto, PrecioPorMetro, Pedido, PedidoItem, Pago, PagoComprobante, Trabajo, Cliente
+from .models import PedidoBorrado, siguiente_cambio, cambio_actual
+from . import estadisticas, importacion, catalogo, precios, pdf, comprobantes, trabajos, eventos, busqueda, clientes
+from sqlalchemy import func, insert, or_, and_
 from datetime import datetime, timedelta, date
-from io import BytesIO
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
 import os
-from werkzeug.utils import secure_filename
+import json
+import secrets
+import mimetypes
+from io import BytesIO
+from werkzeug.security import safe_join
+from sqlalchemy.orm import load_only, selectinload
+
+# Comprobantes y miniaturas: nombres inmutables -> cache de un año en el browser
+COMPROBANTE_MAX_AGE = 365 * 24 * 3600
+
+API_PEDIDOS_LIMIT = 50
+API_PEDIDOS_LIMIT_MAX = 200
+
+# Campo expuesto por /api/pedidos -> columnas que necesita para armarse
+CAMPOS_PEDIDO = {
+    "id": [Pedido.id],
+    "cliente": [Pedido.cliente],
+    "forma_pago": [Pedido.forma_pago_preferida],
+    "sena": [Pedido.monto_sena],
+    "telefono": [Pedido.telefono],
+    "estado": [Pedido.estado],
+    "total": [Pedido.total],
+    "pendiente_at": [Pedido.estado, Pedido.created_at],
+    "en_curso_at": [Pedido.estado, Pedido.en_curso_at],
+    "finalizado_at": [Pedido.estado, Pedido.finalizado_at],
+}
+
+
+def _fecha_si(p, estado, attr):
+    if p.estado != estado:
+        return "-"
+    f = getattr(p, attr)
+    return f.strftime("%d/%m/%Y") if f else "-"
+
+
+# Cómo se arma cada campo (solo se evalúan los pedidos en fields=, para no disparar lazy loads)
+_ARMAR_CAMPO = {
+    "id": lambda p: p.id,
+    "cliente": lambda p: p.cliente,
+    "forma_pago": lambda p: p.forma_pago_preferida or "-",
+    "sena": lambda p: "Sí" if p.monto_sena else "No",
+    "telefono": lambda p: p.telefono,
+    "estado": lambda p: p.estado,
+    "total": lambda p: float(p.total),
+    "pendiente_at": lambda p: _fecha_si(p, "PENDIENTE", "created_at"),
+    "en_curso_at": lambda p: _fecha_si(p, "EN_CURSO", "en_curso_at"),
+    "finalizado_at": lambda p: _fecha_si(p, "FINALIZADO", "finalizado_at"),
+}
+
+
+def _entero_opcional(nombre):
+    # None si no vino; ValueError si vino algo que no es un entero (no se ignora en silencio)
+    valor = request.args.get(nombre)
+    if valor is None or valor == "":
+        return None
+    return int(valor)
+
+
+def _pedido_resumen(p, campos=CAMPOS_PEDIDO):
+    return {k: _ARMAR_CAMPO[k](p) for k in campos}
+
 
 def register_routes(app):
     @app.get("/")
@@ -43,6 +103,7 @@ def register_routes(app):
         p = Producto(nombre=nombre, material=material, por_metro=por_metro, precio=precio)
         db.session.add(p)
         db.session.commit()
+        catalogo.invalidar()
         flash("Producto agregado.", "success")
         return redirect(url_for("productos"))
 
@@ -52,6 +113,7 @@ def register_routes(app):
         p = Producto.query.get_or_404(pid)
         db.session.delete(p)
         db.session.commit()
+        catalogo.invalidar()
         flash("Producto eliminado.", "success")
         return redirect(url_for("productos"))
 
@@ -67,10 +129,10 @@ def register_routes(app):
     def configuracion_post():
         # Recibimos arrays: material[] y precio[]
         materiales = request.form.getlist("material[]")
-        precios = request.form.getlist("precio[]")
+        precios_form = request.form.getlist("precio[]")
 
-        PrecioPorMetro.query.delete()
-        for m, p in zip(materiales, precios):
+        nuevos = {}
+        for m, p in zip(materiales, precios_form):
             m = (m or "").strip()
             if not m:
                 continue
@@ -79,9 +141,14 @@ def register_routes(app):
             except ValueError:
                 flash(f"Precio inválido para {m}.", "danger")
                 return redirect(url_for("configuracion"))
-            db.session.add(PrecioPorMetro(material=m, precio=val))
+            nuevos[m] = val
+
+        # Solo INSERT/UPDATE/DELETE de lo que cambió (+ historial), en una transacción
+        altas, cambios, bajas = precios.guardar_precios(nuevos)
+        if altas or cambios or bajas:
+            db.session.commit()
+            catalogo.invalidar()
 
-        db.session.commit()
         flash("Precios actualizados.", "success")
         return redirect(url_for("configuracion"))
 
@@ -89,9 +156,50 @@ def register_routes(app):
     @app.get("/presupuestador")
     @login_required
     def presupuestador():
-        productos = Producto.query.order_by(Producto.nombre.asc()).all()
-        precios_pm = {x.material: x.precio for x in PrecioPorMetro.query.all()}
-        return render_template("presupuestador.html", productos=productos, precios_pm=precios_pm)
+        cat = catalogo.obtener()
+        return render_template("presupuestador.html", productos=cat["productos"], precios_pm=cat["precios_pm"])
+
+    @app.get("/api/catalogo")
+    @login_required
+    def api_catalogo():
+        cat = catalogo.obtener()
+        if request.if_none_match.contains(cat["etag"]):
+            resp = make_response("", 304)
+        else:
+            resp = jsonify({"version": cat["version"], **cat["payload"]})
+        resp.set_etag(cat["etag"])
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp
+
+    @app.get("/api/clientes/autocompletar")
+    @login_required
+    def api_clientes_autocompletar():
+        texto = (request.args.get("q") or "").strip()
+        limit = max(1, min(request.args.get("limit", 10, type=int), 50))
+        return {
+            "clientes": [
+                {
+                    "id": c.id,
+                    "nombre": c.nombre,
+                    "telefono": c.telefono,
+                    "direccion": c.direccion,
+                    "email": c.email,
+                } for c in clientes.autocompletar(texto, limit)
+            ]
+        }
+
+    @app.get("/api/clientes/<int:cid>/pedidos")
+    @login_required
+    def api_cliente_pedidos(cid):
+        # Historial del cliente: index scan sobre pedido.cliente_id
+        db.session.get(Cliente, cid) or abort(404)
+        pedidos = (
+            Pedido.query.filter(Pedido.cliente_id == cid, Pedido.activo == True)
+            .order_by(Pedido.id.desc())
+            .limit(API_PEDIDOS_LIMIT_MAX)
+            .all()
+        )
+        return {"pedidos": [_pedido_resumen(p) for p in pedidos]}
 
     @app.post("/presupuestador/crear_pedido")
     @login_required
@@ -141,7 +249,9 @@ def register_routes(app):
             flash("Seleccioná al menos un producto.", "warning")
             return redirect(url_for("presupuestador"))
 
-        precios_pm = {x.material: x.precio for x in PrecioPorMetro.query.all()}
+        # Productos y precios por metro salen del catálogo en memoria (sin ir a la DB)
+        cat = catalogo.obtener()
+        precios_pm = cat["precios_pm"]
 
         ahora = datetime.utcnow()
 
@@ -156,15 +266,20 @@ def register_routes(app):
             monto_sena=monto_sena,
             estado="PENDIENTE",
             created_at=ahora,
-            pendiente_at=ahora
+            pendiente_at=ahora,
+            cambio=siguiente_cambio(),
+            cliente_ref=clientes.obtener_o_crear(cliente, telefono, direccion, email)
         )
         
         db.session.add(pedido)
         db.session.flush()  # para obtener pedido.id
 
+        productos = cat["por_id"]
+
         total = 0.0
+        items = []
         for pid in ids:
-            prod = Producto.query.get(int(pid))
+            prod = productos.get(int(pid))
             if not prod:
                 continue
 
@@ -174,52 +289,176 @@ def register_routes(app):
                 precio_m = precios_pm.get(prod.material, 0.0)
                 subtotal = cant * metros * precio_m
                 desc = f"{prod.nombre} - {prod.material} ({metros}m x ${precio_m})"
-                item = PedidoItem(pedido_id=pedido.id, descripcion=desc, cantidad=cant, metros=metros, subtotal=subtotal)
+                item = dict(pedido_id=pedido.id, descripcion=desc, cantidad=cant, metros=metros, subtotal=subtotal)
             else:
                 cant = int(request.form.get(f"cant_{prod.id}", "1").strip() or 1)
                 subtotal = cant * prod.precio
                 desc = f"{prod.nombre} - {prod.material} (${prod.precio})"
-                item = PedidoItem(pedido_id=pedido.id, descripcion=desc, cantidad=cant, metros=None, subtotal=subtotal)
+                item = dict(pedido_id=pedido.id, descripcion=desc, cantidad=cant, metros=None, subtotal=subtotal)
 
             total += subtotal
-            db.session.add(item)
+            items.append(item)
+
+        # INSERT de todos los items en un solo executemany
+        if items:
+            db.session.execute(insert(PedidoItem), items)
 
         pedido.total = total
+        pedido.saldo = total - (monto_sena or 0.0)
+        estadisticas.registrar_alta(pedido)
         db.session.commit()
+        estadisticas.invalidar()
+        publicar_pedido("pedido_creado", pedido)
         flash(f"Pedido creado. Total: ${total:.2f}", "success")
         return redirect(url_for("pedidos"))
 
+    # ---------- EVENTOS EN VIVO ----------
+    def publicar_pedido(tipo, pedido):
+        # Después del commit: los tableros abiertos reemplazan o insertan la tarjeta
+        html = render_template("partials/pedido_card.html", p=pedido) if pedido.activo else None
+        eventos.publicar(tipo, id=pedido.id, estado=pedido.estado, activo=pedido.activo, html=html)
+
+    @app.get("/api/eventos/stream")
+    @login_required
+    def api_eventos_stream():
+        # Al reconectar el navegador manda Last-Event-ID; la primera vez, el cursor de la página
+        cursor = request.headers.get("Last-Event-ID") or request.args.get("cursor") or eventos.cursor_actual()
+        if not eventos.reservar(app.config["EVENTOS_MAX_ESPERAS"]):
+            # Sin lugar: el EventSource queda CLOSED y el tablero pasa a /api/eventos
+            return Response("Demasiadas conexiones de eventos", 503,
+                            mimetype="text/plain", headers={"Retry-After": "5"})
+        resp = Response(
+            eventos.stream_sse(cursor, app.config["EVENTOS_SSE_DURACION"]),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        # El servidor cierra la respuesta al terminar el stream o cortarse la conexión
+        resp.call_on_close(eventos.liberar)
+        return resp
+
+    @app.get("/api/eventos")
+    @login_required
+    def api_eventos():
+        # Long-poll para cuando SSE no pasa (proxy, navegador viejo)
+        cursor = request.args.get("cursor") or eventos.cursor_actual()
+        timeout = min(request.args.get("timeout", app.config["EVENTOS_LONGPOLL_TIMEOUT"], type=float),
+                      app.config["EVENTOS_LONGPOLL_TIMEOUT"])
+        if not eventos.reservar(app.config["EVENTOS_MAX_ESPERAS"]):
+            # Sin lugar para esperar: contesta ya con lo que haya y el cliente vuelve a
+            # preguntar en `reintentar` segundos (polling corto, sin tomar un hilo)
+            nuevos, cursor = eventos.esperar(cursor, 0)
+            return {"eventos": nuevos or [], "cursor": cursor, "recargar": nuevos is None,
+                    "reintentar": app.config["EVENTOS_POLL_INTERVALO"]}
+        try:
+            nuevos, cursor = eventos.esperar(cursor, timeout)
+        finally:
+            eventos.liberar()
+        return {"eventos": nuevos or [], "cursor": cursor, "recargar": nuevos is None}
+
     # ---------- PEDIDOS ----------
-    def pedidos_por_estado(estado):
-        return Pedido.query.filter_by(
+    def pedidos_por_estado(estado, after=None):
+        query = Pedido.query.filter_by(
             estado=estado,
             activo=True
-        ).order_by(Pedido.id.desc()).all()
+        )
+
+        # FINALIZADO crece para siempre: opcionalmente solo los últimos N días
+        dias_fin = request.args.get("finalizados_dias", type=int) or app.config.get("KANBAN_FINALIZADOS_DIAS")
+        if estado == "FINALIZADO" and dias_fin:
+            desde = datetime.utcnow() - timedelta(days=dias_fin)
+            query = query.filter(func.coalesce(Pedido.finalizado_at, Pedido.created_at) >= desde)
+
+        if after is not None:
+            query = query.filter(Pedido.id < after)
+
+        # items en un solo SELECT ... IN por columna (evita el N+1 del template)
+        ventana = app.config.get("KANBAN_VENTANA", 30)
+        pedidos = (
+            query.options(selectinload(Pedido.items))
+            .order_by(Pedido.id.desc())
+            .limit(ventana + 1)
+            .all()
+        )
+
+        hay_mas = len(pedidos) > ventana
+        pedidos = pedidos[:ventana]
+        return {
+            "pedidos": pedidos,
+            "next_cursor": pedidos[-1].id if hay_mas else None,
+        }
 
 
     @app.get("/pedidos")
     @login_required
     def pedidos():
+        # El cursor se toma antes de las consultas: lo que pase después llega por eventos
+        cursor = eventos.cursor_actual()
         return render_template(
             "pedidos.html",
+            eventos_cursor=cursor,
             pedidos_pendientes=pedidos_por_estado("PENDIENTE"),
             pedidos_en_curso=pedidos_por_estado("EN_CURSO"),
             pedidos_finalizados=pedidos_por_estado("FINALIZADO"),
         )
 
+    @app.get("/api/pedidos/kanban/<estado>")
+    @login_required
+    def api_pedidos_kanban(estado):
+        if estado not in estadisticas.ESTADOS:
+            return {"error": "Estado inválido"}, 400
+
+        try:
+            after = _entero_opcional("after")
+        except ValueError:
+            return {"error": "cursor inválido"}, 400
+
+        columna = pedidos_por_estado(estado, after=after)
+        html = "".join(
+            render_template("partials/pedido_card.html", p=p) for p in columna["pedidos"]
+        )
+        return {"html": html, "next_cursor": columna["next_cursor"]}
+
     @app.post("/pedidos/<int:pid>/finalizar")
     @login_required
     def finalizar_pedido(pid):
         p = Pedido.query.get_or_404(pid)
+        estado_anterior = p.estado
         p.estado = "FINALIZADO"
+        p.marcar_cambio()
+        estadisticas.registrar_cambio(p, estado_anterior, p.activo)
         db.session.commit()
+        estadisticas.invalidar()
+        publicar_pedido("pedido_movido", p)
         flash("Pedido finalizado.", "success")
         return redirect(url_for("pedidos"))
     
     @app.get("/api/pedidos/<int:pid>")
     @login_required
     def api_pedido_detalle(pid):
-        p = Pedido.query.get_or_404(pid)
+        # Revalidación barata: solo leemos el cambio antes de armar todo el agregado.
+        # El cambio sale de la secuencia global y no se repite aunque un id borrado se reutilice
+        # (version vuelve a 1 en un pedido nuevo con el mismo id).
+        cambio = db.session.query(Pedido.cambio).filter(Pedido.id == pid).scalar()
+        if cambio is None:
+            abort(404)
+
+        etag = f"pedido-{pid}-c{cambio}"
+        if request.if_none_match.contains(etag):
+            resp = make_response("", 304)
+            resp.set_etag(etag)
+            resp.headers["Cache-Control"] = "private, no-cache"
+            return resp
+
+        # Pedido + items + pagos + comprobantes en 4 consultas fijas (sin lazy loads por pago)
+        p = (
+            Pedido.query
+            .options(
+                selectinload(Pedido.items),
+                selectinload(Pedido.pagos).selectinload(Pago.comprobantes),
+            )
+            .filter(Pedido.id == pid)
+            .first_or_404()
+        )
 
         items = []
         for it in p.items:
@@ -231,7 +470,6 @@ def register_routes(app):
             })
 
         pagos = []
-        total_pagado = 0.0
 
         pagos_ordenados = sorted(
             getattr(p, "pagos", []) or [],
@@ -239,8 +477,6 @@ def register_routes(app):
         )
 
         for idx, pay in enumerate(pagos_ordenados, start=1):
-            total_pagado += float(pay.monto_pagado or 0.0)
-
             pagos.append({
                 "id": pay.id,
                 "numero_pago": idx,        
@@ -254,15 +490,13 @@ def register_routes(app):
                     {
                         "id": c.id,
                         "original_name": c.original_name,
-                        "url": url_for("ver_comprobante", filename=c.filename)
+                        "url": url_for("ver_comprobante", filename=c.filename),
+                        "thumb_url": url_for("ver_miniatura", filename=c.filename)
                     } for c in (pay.comprobantes or [])
                 ]
             })
 
-        monto_sena_val = float(p.monto_sena or 0.0)
-        debe = float(p.total or 0.0) - monto_sena_val - total_pagado
-
-        return {
+        resp = jsonify({
             "id": p.id,
             "cliente": p.cliente,
             "telefono": p.telefono or "-",
@@ -271,53 +505,27 @@ def register_routes(app):
             "observaciones": p.observaciones or "-",
             "forma_pago": p.forma_pago_preferida or "-",
             "monto_sena": float(p.monto_sena) if p.monto_sena else None,
-            "total_pagado": float(total_pagado),
-            "debe": float(debe),                 # 👈 sigue igual
+            # Columnas mantenidas en cada pago (las mismas que la tarjeta y deudores)
+            "total_pagado": float(p.total_pagado),
+            "debe": float(p.saldo),
             "total": float(p.total or 0.0),
             "estado": p.estado,
             "items": items,
             "pagos": pagos
-        }
+        })
+        resp.set_etag(f"pedido-{p.id}-c{p.cambio}")
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp
     
     @app.get("/dashboard")
     @login_required
     def dashboard():
-        base = Pedido.query.filter(Pedido.activo == True)
-
-        total_pedidos = base.count()
-        pendientes = base.filter(Pedido.estado == "PENDIENTE").count()
-        en_curso = base.filter(Pedido.estado == "EN_CURSO").count()
-        finalizados = base.filter(Pedido.estado == "FINALIZADO").count()
-
-        # ===== Totales por estado ($) =====
-        total_pendiente = db.session.query(
-            func.coalesce(func.sum(Pedido.total), 0.0)
-        ).filter_by(activo=True, estado="PENDIENTE").scalar()
-
-        total_en_curso = db.session.query(
-            func.coalesce(func.sum(Pedido.total), 0.0)
-        ).filter_by(activo=True, estado="EN_CURSO").scalar()
-
-        total_finalizado = db.session.query(
-            func.coalesce(func.sum(Pedido.total), 0.0)
-        ).filter_by(activo=True, estado="FINALIZADO").scalar()
-
-        # Ventas / totales últimos 7 días (por fecha de creación)
-        hoy = datetime.utcnow().date()
-        dias = [hoy - timedelta(days=i) for i in range(6, -1, -1)]
-
-        serie_labels = [d.strftime("%d/%m") for d in dias]
-        serie_totales = []
-        serie_cant = []
-
-        for d in dias:
-            inicio = datetime(d.year, d.month, d.day)
-            fin = inicio + timedelta(days=1)
-            total_dia = db.session.query(func.coalesce(func.sum(Pedido.total), 0.0))\
-                .filter(Pedido.activo == True, Pedido.created_at >= inicio, Pedido.created_at < fin).scalar()
-            cant_dia = Pedido.query.filter(Pedido.activo == True, Pedido.created_at >= inicio, Pedido.created_at < fin).count()
-            serie_totales.append(float(total_dia))
-            serie_cant.append(int(cant_dia))
+        cursor = eventos.cursor_actual()
+        # KPIs + serie diaria: 2 consultas agrupadas, cacheadas hasta la próxima escritura
+        resumen = estadisticas.resumen_dashboard(dias=7)
+        cantidades = resumen["cantidades"]
+        totales = resumen["totales"]
+        serie = resumen["serie"]
 
         # ===== Productos más vendidos =====
         productos_data = (
@@ -337,31 +545,87 @@ def register_routes(app):
         productos_cantidades = [int(p[1]) for p in productos_data]
 
         ultimos = Pedido.query.filter(Pedido.activo == True).order_by(Pedido.id.desc()).limit(5).all()
-        pedidos_modal = Pedido.query.filter(Pedido.activo == True).order_by(Pedido.id.desc()).all()
 
         return render_template(
             "dashboard.html",
-            total_pedidos=total_pedidos,
-            pendientes=pendientes,
-            en_curso=en_curso,
-            finalizados=finalizados,
-            total_pendiente=total_pendiente,
-            total_en_curso=total_en_curso,
-            total_finalizado=total_finalizado,
-            serie_labels=serie_labels,
-            serie_totales=serie_totales,
+            eventos_cursor=cursor,
+            total_pedidos=resumen["total_pedidos"],
+            pendientes=cantidades["PENDIENTE"],
+            en_curso=cantidades["EN_CURSO"],
+            finalizados=cantidades["FINALIZADO"],
+            total_pendiente=totales["PENDIENTE"],
+            total_en_curso=totales["EN_CURSO"],
+            total_finalizado=totales["FINALIZADO"],
+            serie_labels=serie["labels"],
+            serie_totales=serie["totales"],
             productos_labels=productos_labels,
             productos_cantidades=productos_cantidades,
             ultimos=ultimos,
-            pedidos_modal=pedidos_modal,
         )
     
+    @app.get("/api/dashboard/resumen")
+    @login_required
+    def api_dashboard_resumen():
+        resumen = estadisticas.resumen_dashboard(dias=7)
+        return {
+            "cantidades": resumen["cantidades"],
+            "totales": resumen["totales"],
+            "total_pedidos": resumen["total_pedidos"],
+        }
+
+    @app.get("/api/dashboard/ventas")
+    @login_required
+    def api_dashboard_ventas():
+        try:
+            dias = int(request.args.get("dias", 30))
+        except ValueError:
+            return {"error": "dias inválido"}, 400
+        if dias not in estadisticas.RANGOS_DIAS:
+            return {"error": f"dias debe ser uno de {estadisticas.RANGOS_DIAS}"}, 400
+
+        agrupar = request.args.get("agrupar", "dia")
+        if agrupar not in ("dia", "mes"):
+            return {"error": "agrupar debe ser 'dia' o 'mes'"}, 400
+
+        serie = estadisticas.serie_ventas(dias=dias, agrupar=agrupar)
+        return {"dias": dias, "agrupar": agrupar, **serie}
+
     @app.get("/api/pedidos")
     @login_required
     def api_pedidos():
         estado = request.args.get("estado")
         cliente = request.args.get("cliente")
 
+        try:
+            limit = int(request.args.get("limit", API_PEDIDOS_LIMIT))
+        except ValueError:
+            return {"error": "limit inválido"}, 400
+        try:
+            after = _entero_opcional("after")
+            before = _entero_opcional("before")
+        except ValueError:
+            return {"error": "cursor inválido"}, 400
+        limit = max(1, min(limit, API_PEDIDOS_LIMIT_MAX))
+
+        if after is not None and before is not None:
+            return {"error": "usar after o before, no ambos"}, 400
+
+        campos = list(CAMPOS_PEDIDO)
+        fields = (request.args.get("fields") or "").strip()
+        if fields:
+            campos = [f.strip() for f in fields.split(",") if f.strip()]
+            invalidos = [f for f in campos if f not in CAMPOS_PEDIDO]
+            if invalidos:
+                return {"error": f"campos inválidos: {', '.join(invalidos)}"}, 400
+
+        since = request.args.get("since")
+        if since is not None:
+            try:
+                since = int(since)
+            except ValueError:
+                return {"error": "since inválido"}, 400
+            return pedidos_desde(since, campos, limit)
+
         query = Pedido.query.filter(Pedido.activo == True)
 
         if estado and estado != "TODOS":
@@ -370,104 +634,281 @@ def register_routes(app):
         if cliente:
             query = query.filter(Pedido.cliente.ilike(f"%{cliente}%"))
 
-        pedidos = query.order_by(Pedido.id.desc()).all()
+        total = query.count() if request.args.get("total") == "1" else None
+
+        # Solo traemos las columnas que pide la proyección
+        columnas = {"id": Pedido.id}
+        for f in campos:
+            columnas.update({c.key: c for c in CAMPOS_PEDIDO[f]})
+        query = query.options(load_only(*columnas.values()))
+
+        # Keyset sobre Pedido.id (orden desc): after = página siguiente, before = anterior
+        if before is not None:
+            pedidos = query.filter(Pedido.id > before).order_by(Pedido.id.asc()).limit(limit + 1).all()
+            hay_mas = len(pedidos) > limit
+            pedidos = list(reversed(pedidos[:limit]))
+            hay_siguiente, hay_anterior = True, hay_mas
+        else:
+            if after is not None:
+                query = query.filter(Pedido.id < after)
+            pedidos = query.order_by(Pedido.id.desc()).limit(limit + 1).all()
+            hay_mas = len(pedidos) > limit
+            pedidos = pedidos[:limit]
+            hay_siguiente, hay_anterior = hay_mas, after is not None
 
         data = []
         for p in pedidos:
-            estado = p.estado
-
-            pend = "-"
-            curso = "-"
-            fin = "-"
-
-            if estado == "PENDIENTE":
-                pend = p.created_at.strftime("%d/%m/%Y") if p.created_at else "-"
-            elif estado == "EN_CURSO":
-                curso = p.en_curso_at.strftime("%d/%m/%Y") if p.en_curso_at else "-"
-            elif estado == "FINALIZADO":
-                fin = p.finalizado_at.strftime("%d/%m/%Y") if p.finalizado_at else "-"
-
-            data.append({
-                "id": p.id,
-                "cliente": p.cliente,
-                "forma_pago": p.forma_pago_preferida or "-",
-                "sena": "Sí" if p.monto_sena else "No",
-                "telefono": p.telefono,
-                "estado": p.estado,
-                "total": float(p.total),
-                "pendiente_at": pend,
-                "en_curso_at": curso,
-                "finalizado_at": fin,
-            })
+            data.append(_pedido_resumen(p, campos))
+
+        resp = {
+            "pedidos": data,
+            "next_cursor": pedidos[-1].id if pedidos and hay_siguiente else None,
+            "prev_cursor": pedidos[0].id if pedidos and hay_anterior else None,
+        }
+        if total is not None:
+            resp["total"] = total
+        return resp
+
+    @app.get("/api/buscar")
+    @login_required
+    def api_buscar():
+        # Búsqueda por relevancia en cliente, teléfono, dirección, observaciones e items.
+        # Mismo formato que /api/pedidos; el cursor es un offset (el orden es por ranking).
+        texto = (request.args.get("q") or "").strip()
+        estado = request.args.get("estado")
+        if estado == "TODOS":
+            estado = None
+
+        try:
+            limit = int(request.args.get("limit", API_PEDIDOS_LIMIT))
+            offset = int(request.args.get("after") or 0)
+        except ValueError:
+            return {"error": "limit/after inválido"}, 400
+        limit = max(1, min(limit, API_PEDIDOS_LIMIT_MAX))
+
+        campos = list(CAMPOS_PEDIDO)
+        fields = (request.args.get("fields") or "").strip()
+        if fields:
+            campos = [f.strip() for f in fields.split(",") if f.strip()]
+            invalidos = [f for f in campos if f not in CAMPOS_PEDIDO]
+            if invalidos:
+                return {"error": f"campos inválidos: {', '.join(invalidos)}"}, 400
+
+        ids, total = busqueda.buscar(
+            texto, estado=estado, limit=limit + 1, offset=offset,
+            total=request.args.get("total") == "1",
+        )
+        hay_mas = len(ids) > limit
+        ids = ids[:limit]
+
+        columnas = {"id": Pedido.id}
+        for f in campos:
+            columnas.update({c.key: c for c in CAMPOS_PEDIDO[f]})
+        por_id = {
+            p.id: p
+            for p in Pedido.query.options(load_only(*columnas.values())).filter(Pedido.id.in_(ids))
+        } if ids else {}
+
+        resp = {
+            "pedidos": [_pedido_resumen(por_id[i], campos) for i in ids if i in por_id],
+            "next_cursor": offset + limit if hay_mas else None,
+        }
+        if total is not None:
+            resp["total"] = total
+        return resp
+
+    def pedidos_desde(since, campos, limit):
+        """Delta para clientes en sync: pedidos cambiados y borrados con cambio > since.
+
+        Orden por cambio (único por escritura); si quedan más, `version` es el último
+        entregado y `hay_mas` indica que hay que volver a pedir con ese since.
+        """
+        columnas = {"id": Pedido.id, "cambio": Pedido.cambio, "activo": Pedido.activo}
+        for f in campos:
+            columnas.update({c.key: c for c in CAMPOS_PEDIDO[f]})
+
+        # Se lee la marca antes que las filas: un cambio concurrente vuelve en el próximo sync
+        tope = cambio_actual()
+        cambiados = (
+            Pedido.query.options(load_only(*columnas.values()))
+            .filter(Pedido.cambio > since, Pedido.cambio <= tope)
+            .order_by(Pedido.cambio.asc())
+            .limit(limit + 1)
+            .all()
+        )
+        borrados = (
+            PedidoBorrado.query
+            .filter(PedidoBorrado.cambio > since, PedidoBorrado.cambio <= tope)
+            .order_by(PedidoBorrado.cambio.asc())
+            .limit(limit + 1)
+            .all()
+        )
+
+        # Merge por cambio y corte en limit
+        todos = sorted(
+            [(p.cambio, p) for p in cambiados] + [(b.cambio, b) for b in borrados],
+            key=lambda x: x[0],
+        )
+        hay_mas = len(todos) > limit
+        todos = todos[:limit]
+        version = todos[-1][0] if hay_mas else tope
+
+        pedidos, eliminados = [], []
+        for cambio, x in todos:
+            if isinstance(x, PedidoBorrado):
+                eliminados.append(x.pedido_id)
+            elif not x.activo:
+                eliminados.append(x.id)      # baja lógica
+            else:
+                pedidos.append({**_pedido_resumen(x, campos), "cambio": cambio})
+
+        # El cliente aplica primero `eliminados` y después `pedidos`
+        return {"pedidos": pedidos, "eliminados": eliminados, "version": version, "hay_mas": hay_mas}
+
+    @app.get("/api/pedidos/deudores")
+    @login_required
+    def api_pedidos_deudores():
+        # Pedidos activos con saldo > 0, de mayor a menor deuda (keyset sobre saldo, id)
+        limit = max(1, min(request.args.get("limit", API_PEDIDOS_LIMIT, type=int), API_PEDIDOS_LIMIT_MAX))
+
+        query = Pedido.query.filter(Pedido.activo == True, Pedido.saldo > 0.005)
+
+        after = request.args.get("after")
+        if after:
+            try:
+                saldo_s, id_s = after.split(":", 1)
+                after_saldo, after_id = float(saldo_s), int(id_s)
+            except ValueError:
+                return {"error": "cursor inválido"}, 400
+            query = query.filter(or_(
+                Pedido.saldo < after_saldo,
+                and_(Pedido.saldo == after_saldo, Pedido.id < after_id),
+            ))
+
+        campos = ["id", "cliente", "telefono", "estado", "total"]
+        pedidos = (
+            query.options(load_only(Pedido.id, Pedido.cliente, Pedido.telefono, Pedido.estado,
+                                    Pedido.total, Pedido.monto_sena, Pedido.total_pagado, Pedido.saldo))
+            .order_by(Pedido.saldo.desc(), Pedido.id.desc())
+            .limit(limit + 1)
+            .all()
+        )
+        hay_mas = len(pedidos) > limit
+        pedidos = pedidos[:limit]
+
+        data = []
+        for p in pedidos:
+            fila = _pedido_resumen(p, campos)
+            fila["monto_sena"] = float(p.monto_sena or 0.0)
+            fila["total_pagado"] = float(p.total_pagado)
+            fila["saldo"] = float(p.saldo)
+            data.append(fila)
+
+        ultimo = pedidos[-1] if pedidos else None
+        return {
+            "pedidos": data,
+            "next_cursor": f"{ultimo.saldo!r}:{ultimo.id}" if hay_mas else None,
+        }
+
+    @app.post("/api/pedidos/importar")
+    @login_required
+    def api_importar_pedidos():
+        # JSON {"pedidos": [...]} o CSV (archivo "archivo" o body text/csv)
+        try:
+            if request.is_json:
+                registros = (request.get_json() or {}).get("pedidos") or []
+            else:
+                archivo = request.files.get("archivo")
+                contenido = archivo.read() if archivo else request.get_data()
+                registros = importacion.leer_csv(contenido.decode("utf-8-sig"))
+
+            creados = importacion.importar_pedidos(registros)
+        except (ValueError, UnicodeDecodeError) as e:
+            return {"error": str(e)}, 400
+
+        eventos.publicar("pedidos_importados", cantidad=creados)
+        return {"ok": True, "creados": creados}, 201
 
-        return {"pedidos": data}
-    
     @app.get("/pedidos/<int:pid>/pdf")
     @login_required
     def pedido_pdf(pid):
-        p = Pedido.query.get_or_404(pid)
+        p = Pedido.query.options(selectinload(Pedido.items)).filter(Pedido.id == pid).first_or_404()
 
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer, pagesize=A4)
-        w, h = A4
-
-        y = h - 50
-        c.setFont("Helvetica-Bold", 16)
-        c.drawString(50, y, "Comprobante de Pedido")
-        y -= 25
-
-        c.setFont("Helvetica", 11)
-        c.drawString(50, y, f"Pedido: #{p.id}")
-        y -= 16
-        c.drawString(50, y, f"Cliente: {p.cliente}")
-        y -= 16
-        c.drawString(50, y, f"Teléfono: {p.telefono}")
-        y -= 16
-        c.drawString(50, y, f"Dirección: {p.direccion}")
-        y -= 16
-        c.drawString(50, y, f"Estado: {p.estado}")
-        y -= 22
-
-        if p.observaciones:
-            c.setFont("Helvetica-Bold", 11)
-            c.drawString(50, y, "Observaciones:")
-            y -= 16
-            c.setFont("Helvetica", 11)
-            # simple wrap
-            text = c.beginText(50, y)
-            for line in str(p.observaciones).splitlines():
-                text.textLine(line)
-            c.drawText(text)
-            y = text.getY() - 10
-
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(50, y, "Detalle:")
-        y -= 18
-
-        c.setFont("Helvetica", 11)
-        for it in p.items:
-            linea = f"- {it.descripcion} | Cant: {it.cantidad} | Subtotal: ${it.subtotal:.2f}"
-            c.drawString(55, y, linea[:110])
-            y -= 14
-            if y < 80:
-                c.showPage()
-                y = h - 50
-
-        y -= 10
-        c.setFont("Helvetica-Bold", 14)
-        c.drawString(50, y, f"TOTAL: ${p.total:.2f}")
-
-        c.showPage()
-        c.save()
-
-        buffer.seek(0)
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f"pedido_{p.id}.pdf",
-            mimetype="application/pdf"
+        # Cache en disco por hash del contenido: un pedido que no cambió no se vuelve a dibujar
+        d = pdf.datos_pedido(p)
+        opciones = dict(as_attachment=True, download_name=f"pedido_{p.id}.pdf", mimetype="application/pdf")
+        for _ in range(2):
+            path, clave = pdf.pdf_cacheado(app.config["PDF_CACHE_DIR"], d, app.config["PDF_CACHE_MAX_BYTES"])
+            try:
+                resp = send_file(path, etag=clave, conditional=True, **opciones)
+                break
+            except FileNotFoundError:
+                continue  # otro request lo evictó entre medio: se vuelve a generar
+        else:
+            resp = send_file(BytesIO(pdf.render_pedido_pdf(d)), etag=clave, conditional=True, **opciones)
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp
+
+    @app.get("/pedidos/pdf.zip")
+    @login_required
+    def pedidos_pdf_zip():
+        # Filtro: estado, desde/hasta (YYYY-MM-DD, por fecha de creación) e ids=1,2,3
+        try:
+            filtro = pdf.parsear_filtro(**{k: request.args.get(k) for k in ("estado", "desde", "hasta", "ids")})
+        except ValueError:
+            return {"error": "Filtro inválido"}, 400
+
+        estado = filtro["estado"]
+        query = pdf.consulta_exportacion(**filtro)
+        nombre = f"pedidos_{(estado or 'todos').lower()}_{datetime.utcnow():%Y%m%d}.zip"
+        return Response(
+            stream_with_context(pdf.zip_pdfs(query, workers=app.config.get("PDF_WORKERS"))),
+            mimetype="application/zip",
+            headers={"Content-Disposition": f'attachment; filename="{nombre}"'},
         )
 
+    # ---------- TRABAJOS EN SEGUNDO PLANO ----------
+    @app.post("/api/trabajos/exportar-pdfs")
+    @login_required
+    def api_trabajo_exportar_pdfs():
+        # Igual que /pedidos/pdf.zip pero el ZIP queda en disco; se consulta con /api/trabajos/<id>
+        data = request.get_json(silent=True) or request.form
+        filtro = {k: data.get(k) for k in ("estado", "desde", "hasta", "ids")}
+        try:
+            pdf.parsear_filtro(**filtro)
+        except ValueError:
+            return {"error": "Filtro inválido"}, 400
+
+        archivo = f"pedidos_{datetime.utcnow():%Y%m%d_%H%M%S}_{secrets.token_hex(4)}.zip"
+        t = trabajos.encolar("exportar_pdfs", archivo=archivo, **filtro)
+        db.session.commit()
+        return trabajos.estado(t), 202, {"Location": url_for("api_trabajo", tid=t.id)}
+
+    @app.post("/api/trabajos/reconstruir-ventas")
+    @login_required
+    def api_trabajo_reconstruir_ventas():
+        t = trabajos.encolar("reconstruir_ventas", max_intentos=1)
+        db.session.commit()
+        return trabajos.estado(t), 202, {"Location": url_for("api_trabajo", tid=t.id)}
+
+    @app.get("/api/trabajos/<int:tid>")
+    @login_required
+    def api_trabajo(tid):
+        t = db.session.get(Trabajo, tid) or abort(404)
+        datos = trabajos.estado(t)
+        if t.tipo == "exportar_pdfs" and t.estado == "hecho":
+            datos["descarga_url"] = url_for("api_trabajo_descarga", tid=t.id)
+        return datos
+
+    @app.get("/api/trabajos/<int:tid>/descarga")
+    @login_required
+    def api_trabajo_descarga(tid):
+        t = db.session.get(Trabajo, tid) or abort(404)
+        if t.tipo != "exportar_pdfs" or t.estado != "hecho":
+            return {"error": "Trabajo sin archivo"}, 404
+        archivo = json.loads(t.resultado)["archivo"]
+        return send_from_directory(app.config["EXPORTACIONES_DIR"], archivo, as_attachment=True)
+
     @app.post("/pedidos/mover/<int:id>")
     @login_required
     def mover_pedido(id):
@@ -495,8 +936,13 @@ def register_routes(app):
         elif nuevo_estado == "FINALIZADO":
             pedido.finalizado_at = ahora
 
+        estado_anterior = pedido.estado
         pedido.estado = nuevo_estado
+        pedido.marcar_cambio()
+        estadisticas.registrar_cambio(pedido, estado_anterior, pedido.activo)
         db.session.commit()
+        estadisticas.invalidar()
+        publicar_pedido("pedido_movido", pedido)
 
         if nuevo_estado == "PENDIENTE":
             fecha = (pedido.pendiente_at if hasattr(pedido, "pendiente_at") else pedido.created_at)
@@ -521,11 +967,18 @@ def register_routes(app):
             print("Activo:", pedido.activo)
 
             if pedido.estado in ["PENDIENTE", "EN_CURSO"]:
+                estadisticas.registrar_baja(pedido)
                 db.session.delete(pedido)
+                db.session.merge(PedidoBorrado(pedido_id=pedido.id, cambio=siguiente_cambio()))
             else:
+                activo_anterior = pedido.activo
                 pedido.activo = False
+                pedido.marcar_cambio()
+                estadisticas.registrar_cambio(pedido, pedido.estado, activo_anterior)
 
             db.session.commit()
+            estadisticas.invalidar()
+            eventos.publicar("pedido_eliminado", id=id)
             return "", 204
 
         except Exception as e:
@@ -582,59 +1035,106 @@ def register_routes(app):
             pago.cuotas = c
             pago.monto_cuota = mc
 
-        db.session.add(pago)
-        db.session.flush()  # pago.id
-
-        # comprobante (opcional)
+        # comprobante (opcional): se guarda antes de tocar la DB
         file = request.files.get("comprobante")
-        comprobante_url = None
+        comp = None
 
         if file and file.filename:
             # validar tipo
-            allowed = {"application/pdf", "image/png", "image/jpeg"}
-            if file.mimetype not in allowed:
+            if file.mimetype not in comprobantes.TIPOS:
                 return {"error": "Tipo de archivo no permitido"}, 400
 
             uploads_dir = app.config.get("UPLOADS_DIR")
             if not uploads_dir:
                 return {"error": "Uploads no configurado"}, 500
 
-            original = file.filename
-            safe = secure_filename(original)
-            unique = f"pago_{pago.id}_{int(datetime.utcnow().timestamp())}_{safe}"
-            path = os.path.join(uploads_dir, unique)
-            file.save(path)
+            try:
+                filename, size = comprobantes.guardar(
+                    file, uploads_dir, app.config["COMPROBANTE_MAX_BYTES"],
+                    comprobantes.opciones_recodificacion(app.config)
+                )
+            except comprobantes.ArchivoMuyGrande as e:
+                return {"error": str(e)}, 413
 
             comp = PagoComprobante(
-                pago_id=pago.id,
-                filename=unique,
-                original_name=original,
+                filename=filename,
+                original_name=file.filename,
                 mimetype=file.mimetype,
-                size_bytes=getattr(file, "content_length", None)
+                size_bytes=size
             )
-            db.session.add(comp)
+            pago.comprobantes.append(comp)
+
+        db.session.add(pago)
+        pedido.registrar_pago(monto_pagado)
+        pedido.marcar_cambio()
 
-            comprobante_url = url_for("ver_comprobante", filename=unique)
+        if comp:
+            # miniatura en segundo plano (se encola en la misma transacción que el pago)
+            trabajos.encolar("miniatura", filename=comp.filename)
 
         db.session.commit()
+        publicar_pedido("pedido_actualizado", pedido)
 
         return {
             "ok": True,
             "pago_id": pago.id,
-            "comprobante_url": comprobante_url
+            "comprobante_url": url_for("ver_comprobante", filename=comp.filename) if comp else None
         }, 201
     
+    def servir_comprobante(nombre):
+        # Los nombres guardados no se reutilizan (hash del contenido o pago_<id>_<ts>):
+        # el browser puede cachearlos para siempre sin volver a preguntar.
+        uploads_dir = app.config.get("UPLOADS_DIR")
+        if not uploads_dir:
+            return "Uploads no configurado", 500
+        full = safe_join(uploads_dir, nombre)
+        if full is None or not os.path.isfile(full):
+            return "No encontrado", 404
+
+        base = os.path.splitext(os.path.basename(nombre))[0]
+        etag = base if len(base) == 64 and all(ch in "0123456789abcdef" for ch in base) else True
+
+        modo = app.config.get("COMPROBANTES_SENDFILE")
+        if modo == "x-accel":
+            # nginx sirve el archivo (location internal apuntando a UPLOADS_DIR)
+            resp = Response(mimetype=mimetypes.guess_type(full)[0] or "application/octet-stream")
+            resp.headers["X-Accel-Redirect"] = app.config["COMPROBANTES_ACCEL_PREFIX"].rstrip("/") + "/" + nombre
+            if etag is not True:
+                resp.set_etag(etag)
+        else:
+            # "x-sendfile" lo maneja Flask con USE_X_SENDFILE (Apache mod_xsendfile / lighttpd)
+            resp = send_file(full, conditional=True, etag=etag, max_age=COMPROBANTE_MAX_AGE)
+
+        resp.cache_control.public = False
+        resp.cache_control.private = True
+        resp.cache_control.max_age = COMPROBANTE_MAX_AGE
+        resp.cache_control.immutable = True
+        return resp
+
     @app.get("/uploads/comprobantes/<path:filename>")
     @login_required
     def ver_comprobante(filename):
+        return servir_comprobante(filename)
+
+    @app.get("/uploads/comprobantes/<path:filename>/miniatura")
+    @login_required
+    def ver_miniatura(filename):
         uploads_dir = app.config.get("UPLOADS_DIR")
         if not uploads_dir:
             return "Uploads no configurado", 500
-        full = os.path.join(uploads_dir, filename)
-        if not os.path.exists(full):
+        full = safe_join(uploads_dir, filename)
+        if full is None or not os.path.isfile(full):
             return "No encontrado", 404
-        return send_file(full)
-    
+
+        # Normalmente ya la generó el pool; si no (archivos viejos), se genera acá
+        try:
+            path = comprobantes.generar_miniatura(uploads_dir, filename)
+        except Exception:
+            path = None
+        if path is None:
+            return "Sin vista previa", 404
+        return servir_comprobante(os.path.relpath(path, uploads_dir))
+
     @app.delete("/api/pagos/<int:pay_id>")
     @login_required
     def api_eliminar_pago(pay_id):
@@ -644,6 +1144,9 @@ def register_routes(app):
         pedido = Pedido.query.get_or_404(pago.pedido_id)
 
         db.session.delete(pago)
+        pedido.registrar_pago(-float(pago.monto_pagado or 0.0))
+        pedido.marcar_cambio()
         db.session.commit()
+        publicar_pedido("pedido_actualizado", pedido)
 
         return {"ok": True}, 200
\ No newline at end of file
@@ -0,0 +1,108 @@
+import logging
+import os
+import signal
+import threading
+import time
+import waitress
+from werkzeug.wsgi import ClosingIterator
+from . import eventos
+
+log = logging.getLogger(__name__)
+
+
+def opciones(config, **overrides):
+    """Parámetros de waitress a partir de SERVIDOR_* (los overrides vienen de la línea de comandos)."""
+    hilos = overrides.pop("threads", None) or config["SERVIDOR_HILOS"]
+    o = {
+        "host": config["SERVIDOR_HOST"],
+        "port": config["SERVIDOR_PUERTO"],
+        # Los SSE/long-polls tienen sus propios hilos: nunca dejan sin hilos al resto
+        "threads": hilos + config["EVENTOS_MAX_ESPERAS"],
+        "connection_limit": config["SERVIDOR_CONEXIONES"],
+        "channel_timeout": config["SERVIDOR_TIMEOUT"],
+    }
+    o.update({k: v for k, v in overrides.items() if v is not None})
+    # waitress corta el body antes de que llegue a Flask
+    if config.get("MAX_CONTENT_LENGTH"):
+        o["max_request_body_size"] = config["MAX_CONTENT_LENGTH"]
+    return o
+
+
+class _EnCurso:
+    """Middleware WSGI: cuenta los requests en curso y, al apagar, rechaza los nuevos."""
+
+    def __init__(self, app):
+        self.app = app
+        self.apagando = False
+        self.cantidad = 0
+        self._lock = threading.Lock()
+
+    def _sumar(self, n):
+        with self._lock:
+            self.cantidad += n
+
+    def __call__(self, environ, start_response):
+        if self.apagando:
+            start_response("503 Service Unavailable", [
+                ("Content-Type", "text/plain; charset=utf-8"),
+                ("Retry-After", "5"),
+                ("Connection", "close"),
+            ])
+            return [b"Servidor reiniciando"]
+
+        self._sumar(1)
+        try:
+            resultado = self.app(environ, start_response)
+        except BaseException:
+            self._sumar(-1)
+            raise
+        # Archivos (send_file): waitress los manda sin pasar por los hilos, no
+        # se envuelven para no perder el wsgi.file_wrapper
+        file_wrapper = environ.get("wsgi.file_wrapper")
+        if isinstance(file_wrapper, type) and isinstance(resultado, file_wrapper):
+            self._sumar(-1)
+            return resultado
+        return ClosingIterator(resultado, lambda: self._sumar(-1))
+
+
+def servir(app, apagado=None, **overrides):
+    """Sirve la app con waitress (multi-hilo) hasta SIGTERM/SIGINT.
+
+    Al apagar corta los SSE y long-polls (el navegador reconecta solo), contesta 503
+    a lo que llega y espera hasta `apagado` segundos a que terminen los requests en
+    curso. Una segunda señal corta enseguida.
+    """
+    app.debug = False
+    apagado = app.config["SERVIDOR_APAGADO"] if apagado is None else apagado
+
+    # Igual que waitress.serve: "Sirviendo en ..." y errores de los hilos a la consola
+    logging.basicConfig()
+    logging.getLogger("waitress").setLevel(logging.INFO)
+    log.setLevel(logging.INFO)
+
+    en_curso = _EnCurso(app)
+    server = waitress.create_server(en_curso, **opciones(app.config, **overrides))
+    log.info("Sirviendo en http://%s:%s", server.effective_host, server.effective_port)
+
+    def _esperar_y_cortar():
+        limite = time.monotonic() + apagado
+        while en_curso.cantidad and time.monotonic() < limite:
+            time.sleep(0.1)
+        # Margen para que el loop principal termine de mandar la última respuesta
+        time.sleep(0.5)
+        os.kill(os.getpid(), signal.SIGTERM)
+
+    def _senal(signum, frame):
+        if en_curso.apagando:
+            # server.run() corta el loop y apaga los hilos de waitress
+            raise SystemExit
+        log.info("Apagando: esperando %d requests en curso", en_curso.cantidad)
+        en_curso.apagando = True
+        eventos.cerrar()
+        threading.Thread(target=_esperar_y_cortar, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, _senal)
+    signal.signal(signal.SIGINT, _senal)
+
+    server.run()
+    log.info("Servidor detenido (%d requests cortados)", en_curso.cantidad)
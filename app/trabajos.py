@@ -0,0 +1,188 @@
+import json
+import multiprocessing
+import os
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import event, update, or_
+from sqlalchemy.orm import Session
+from . import db
+from .models import Trabajo
+
+# tipo -> función(app, **payload); lo que devuelve (dict o None) queda en Trabajo.resultado
+TAREAS = {}
+
+_despertar = threading.Event()
+
+
+def tarea(tipo):
+    def registrar(fn):
+        TAREAS[tipo] = fn
+        return fn
+    return registrar
+
+
+def encolar(tipo, max_intentos=3, **payload):
+    """Agrega un trabajo a la sesión actual; los workers lo ven cuando el caller hace commit."""
+    t = Trabajo(tipo=tipo, payload=json.dumps(payload), max_intentos=max_intentos)
+    db.session.add(t)
+    db.session.flush()  # t.id
+    db.session.info["trabajos_nuevos"] = True
+    return t
+
+
+@event.listens_for(Session, "after_commit")
+def _despertar_workers(session):
+    if session.info.pop("trabajos_nuevos", False):
+        _despertar.set()
+
+
+def estado(t):
+    return {
+        "id": t.id,
+        "tipo": t.tipo,
+        "estado": t.estado,
+        "intentos": t.intentos,
+        "max_intentos": t.max_intentos,
+        "resultado": json.loads(t.resultado) if t.resultado else None,
+        "error": t.error,
+        "created_at": t.created_at.strftime("%Y-%m-%d %H:%M:%S") if t.created_at else None,
+        "terminado_at": t.terminado_at.strftime("%Y-%m-%d %H:%M:%S") if t.terminado_at else None,
+    }
+
+
+# ---------- WORKERS ----------
+def _tomar(app):
+    # Pendientes listos, o "corriendo" cuyo plazo venció (el worker que lo tenía se cayó)
+    ahora = datetime.utcnow()
+    candidato = (
+        db.session.query(Trabajo.id, Trabajo.estado, Trabajo.disponible_at)
+        .filter(or_(Trabajo.estado == "pendiente", Trabajo.estado == "corriendo"),
+                Trabajo.disponible_at <= ahora)
+        .order_by(Trabajo.disponible_at.asc(), Trabajo.id.asc())
+        .first()
+    )
+    if candidato is None:
+        db.session.rollback()
+        return None
+
+    # Toma optimista: si otro worker (u otro proceso) lo agarró primero, no matchea
+    res = db.session.execute(
+        update(Trabajo)
+        .where(Trabajo.id == candidato.id,
+               Trabajo.estado == candidato.estado,
+               Trabajo.disponible_at == candidato.disponible_at)
+        .values(
+            estado="corriendo",
+            intentos=Trabajo.intentos + 1,
+            iniciado_at=ahora,
+            disponible_at=ahora + timedelta(seconds=app.config["TRABAJOS_PLAZO"]),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    if res.rowcount != 1:
+        return None
+    return db.session.get(Trabajo, candidato.id)
+
+
+def _ejecutar(app, t):
+    tid = t.id
+    try:
+        fn = TAREAS.get(t.tipo)
+        if fn is None:
+            raise LookupError(f"tipo de trabajo desconocido: {t.tipo}")
+        resultado = fn(app, **json.loads(t.payload or "{}"))
+    except Exception as e:
+        app.logger.exception("Trabajo %s (%s) falló en el intento %s", tid, t.tipo, t.intentos)
+        db.session.rollback()
+        t = db.session.get(Trabajo, tid)
+        t.error = f"{type(e).__name__}: {e}"
+        if t.intentos < t.max_intentos:
+            # Reintento con espera exponencial
+            espera = app.config["TRABAJOS_ESPERA_REINTENTO"] * 2 ** (t.intentos - 1)
+            t.estado = "pendiente"
+            t.disponible_at = datetime.utcnow() + timedelta(seconds=espera)
+        else:
+            t.estado = "fallido"
+            t.terminado_at = datetime.utcnow()
+        db.session.commit()
+        return
+
+    t = db.session.get(Trabajo, tid)
+    t.estado = "hecho"
+    t.resultado = json.dumps(resultado) if resultado is not None else None
+    t.error = None
+    t.terminado_at = datetime.utcnow()
+    db.session.commit()
+
+
+def _registrar_error(app, tid, e):
+    # Falla fuera de la tarea (base, commit): queda "corriendo" y se reintenta al vencer el plazo
+    try:
+        with app.app_context():
+            db.session.execute(
+                update(Trabajo).where(Trabajo.id == tid).values(error=f"{type(e).__name__}: {e}")
+            )
+            db.session.commit()
+    except Exception:
+        app.logger.exception("No se pudo registrar el error del trabajo %s", tid)
+
+
+def _worker(app):
+    while True:
+        tid = None
+        try:
+            with app.app_context():
+                t = _tomar(app)
+                if t is not None:
+                    tid = t.id
+                    _ejecutar(app, t)
+                    continue
+        except Exception as e:
+            app.logger.exception("Error en el worker de trabajos (trabajo %s)", tid)
+            if tid is not None:
+                _registrar_error(app, tid, e)
+
+        _despertar.wait(app.config["TRABAJOS_INTERVALO"])
+        _despertar.clear()
+
+
+def _es_proceso_hijo():
+    # Los pools "spawn" (PDFs) re-importan run.py en cada proceso: ahí no van workers
+    return multiprocessing.parent_process() is not None
+
+
+def iniciar(app):
+    workers = app.config["TRABAJOS_WORKERS"]
+    if not workers or app.testing or _es_proceso_hijo():
+        return
+    for i in range(workers):
+        threading.Thread(target=_worker, args=(app,), name=f"trabajos-{i}", daemon=True).start()
+
+
+# ---------- TAREAS ----------
+@tarea("miniatura")
+def _miniatura(app, filename):
+    from . import comprobantes
+    path = comprobantes.generar_miniatura(app.config["UPLOADS_DIR"], filename)
+    return {"miniatura": os.path.basename(path) if path else None}
+
+
+@tarea("exportar_pdfs")
+def _exportar_pdfs(app, archivo, estado=None, desde=None, hasta=None, ids=None):
+    from . import pdf
+    query = pdf.consulta_exportacion(**pdf.parsear_filtro(estado, desde, hasta, ids))
+
+    destino = os.path.join(app.config["EXPORTACIONES_DIR"], archivo)
+    tmp = destino + ".part"
+    with open(tmp, "wb") as f:
+        for chunk in pdf.zip_pdfs(query, workers=app.config.get("PDF_WORKERS")):
+            f.write(chunk)
+    os.replace(tmp, destino)
+    return {"archivo": archivo, "bytes": os.path.getsize(destino)}
+
+
+@tarea("reconstruir_ventas")
+def _reconstruir_ventas(app):
+    from . import estadisticas
+    return {"filas": estadisticas.reconstruir_rollup()}
@@ -0,0 +1,80 @@
+"""Índice FTS5 de búsqueda sobre pedidos (cliente, teléfono, dirección, observaciones, items)
+
+Revision ID: 3f91c6b8e0a4
+Revises: e58c03d7a2f6
+Create Date: 2026-10-18 19:03:52.114076
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f91c6b8e0a4'
+down_revision = 'e58c03d7a2f6'
+branch_labels = None
+depends_on = None
+
+
+DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS pedido_fts USING fts5(
+        cliente, telefono, direccion, observaciones, items,
+        tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_fts_ai AFTER INSERT ON pedido BEGIN
+        INSERT INTO pedido_fts (rowid, cliente, telefono, direccion, observaciones, items)
+        VALUES (NEW.id, NEW.cliente, NEW.telefono, NEW.direccion, NEW.observaciones, '');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_fts_au AFTER UPDATE OF cliente, telefono, direccion, observaciones ON pedido BEGIN
+        UPDATE pedido_fts SET cliente = NEW.cliente, telefono = NEW.telefono,
+            direccion = NEW.direccion, observaciones = NEW.observaciones
+        WHERE rowid = NEW.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_fts_ad AFTER DELETE ON pedido BEGIN
+        DELETE FROM pedido_fts WHERE rowid = OLD.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_item_fts_ai AFTER INSERT ON pedido_item BEGIN
+        UPDATE pedido_fts SET items = (
+            SELECT group_concat(descripcion, ' ') FROM pedido_item WHERE pedido_id = NEW.pedido_id
+        ) WHERE rowid = NEW.pedido_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_item_fts_au AFTER UPDATE OF descripcion ON pedido_item BEGIN
+        UPDATE pedido_fts SET items = (
+            SELECT group_concat(descripcion, ' ') FROM pedido_item WHERE pedido_id = NEW.pedido_id
+        ) WHERE rowid = NEW.pedido_id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_item_fts_ad AFTER DELETE ON pedido_item BEGIN
+        UPDATE pedido_fts SET items = (
+            SELECT group_concat(descripcion, ' ') FROM pedido_item WHERE pedido_id = OLD.pedido_id
+        ) WHERE rowid = OLD.pedido_id;
+    END""",
+]
+
+TRIGGERS = ['pedido_fts_ai', 'pedido_fts_au', 'pedido_fts_ad',
+            'pedido_item_fts_ai', 'pedido_item_fts_au', 'pedido_item_fts_ad']
+
+
+def upgrade():
+    # FTS5 es de SQLite; en otros motores /api/buscar usa ILIKE
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for sql in DDL:
+        op.execute(sql)
+
+    op.execute("DELETE FROM pedido_fts")
+    op.execute(
+        "INSERT INTO pedido_fts (rowid, cliente, telefono, direccion, observaciones, items) "
+        "SELECT p.id, p.cliente, p.telefono, p.direccion, p.observaciones, "
+        "coalesce((SELECT group_concat(i.descripcion, ' ') FROM pedido_item i WHERE i.pedido_id = p.id), '') "
+        "FROM pedido p"
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+
+    for nombre in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {nombre}")
+    op.execute("DROP TABLE IF EXISTS pedido_fts")
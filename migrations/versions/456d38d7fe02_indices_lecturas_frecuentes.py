@@ -0,0 +1,55 @@
+"""Índices para los filtros/orden más usados (parciales sobre activo)
+
+Revision ID: 456d38d7fe02
+Revises: 65f802b5bc24
+Create Date: 2026-10-18 11:40:52.913027
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '456d38d7fe02'
+down_revision = '65f802b5bc24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # if_not_exists: versiones anteriores hacían db.create_all() al arrancar y pueden haberlos creado
+    with op.batch_alter_table('pedido', schema=None) as batch_op:
+        batch_op.create_index('ix_pedido_activos_estado_id', ['estado', 'id'], unique=False,
+                              sqlite_where=sa.text('activo = 1'), postgresql_where=sa.text('activo'),
+                              if_not_exists=True)
+        batch_op.create_index('ix_pedido_activos_id', ['id'], unique=False,
+                              sqlite_where=sa.text('activo = 1'), postgresql_where=sa.text('activo'),
+                              if_not_exists=True)
+        batch_op.create_index('ix_pedido_activos_created_at', ['created_at'], unique=False,
+                              sqlite_where=sa.text('activo = 1'), postgresql_where=sa.text('activo'),
+                              if_not_exists=True)
+
+    with op.batch_alter_table('pedido_item', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pedido_item_pedido_id'), ['pedido_id'], unique=False, if_not_exists=True)
+
+    with op.batch_alter_table('pago', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pago_pedido_id'), ['pedido_id'], unique=False, if_not_exists=True)
+
+    with op.batch_alter_table('pago_comprobante', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pago_comprobante_pago_id'), ['pago_id'], unique=False, if_not_exists=True)
+
+
+def downgrade():
+    with op.batch_alter_table('pago_comprobante', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pago_comprobante_pago_id'))
+
+    with op.batch_alter_table('pago', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pago_pedido_id'))
+
+    with op.batch_alter_table('pedido_item', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pedido_item_pedido_id'))
+
+    with op.batch_alter_table('pedido', schema=None) as batch_op:
+        batch_op.drop_index('ix_pedido_activos_created_at')
+        batch_op.drop_index('ix_pedido_activos_id')
+        batch_op.drop_index('ix_pedido_activos_estado_id')
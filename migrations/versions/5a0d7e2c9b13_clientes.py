@@ -0,0 +1,134 @@
+"""Tabla cliente (un cliente por teléfono normalizado) y pedido.cliente_id
+
+Revision ID: 5a0d7e2c9b13
+Revises: 3f91c6b8e0a4
+Create Date: 2026-10-18 19:27:08.640215
+
+"""
+import re
+import unicodedata
+from datetime import datetime
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a0d7e2c9b13'
+down_revision = '3f91c6b8e0a4'
+branch_labels = None
+depends_on = None
+
+
+# Copia de app/clientes.py al momento de la migración
+def _nombre(nombre):
+    s = unicodedata.normalize("NFKD", nombre or "")
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+    return " ".join(s.lower().split())
+
+
+def _telefono(telefono):
+    d = re.sub(r"\D", "", telefono or "")
+    if d.startswith("54") and len(d) >= 12:
+        d = d[2:]
+        if d.startswith("9") and len(d) == 11:
+            d = d[1:]
+    d = d.lstrip("0")
+    return d or None
+
+
+# Triggers de pedido del índice FTS (3f91c6b8e0a4) al momento de la migración
+TRIGGERS_FTS_PEDIDO = [
+    """CREATE TRIGGER IF NOT EXISTS pedido_fts_ai AFTER INSERT ON pedido BEGIN
+        INSERT INTO pedido_fts (rowid, cliente, telefono, direccion, observaciones, items)
+        VALUES (NEW.id, NEW.cliente, NEW.telefono, NEW.direccion, NEW.observaciones, '');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_fts_au AFTER UPDATE OF cliente, telefono, direccion, observaciones ON pedido BEGIN
+        UPDATE pedido_fts SET cliente = NEW.cliente, telefono = NEW.telefono,
+            direccion = NEW.direccion, observaciones = NEW.observaciones
+        WHERE rowid = NEW.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_fts_ad AFTER DELETE ON pedido BEGIN
+        DELETE FROM pedido_fts WHERE rowid = OLD.id;
+    END""",
+]
+
+
+def _recrear_triggers_fts(bind):
+    # En SQLite el batch recrea la tabla pedido y se lleva sus triggers del índice FTS
+    # (los rowid no cambian, el contenido del índice sigue valiendo)
+    if bind.dialect.name == 'sqlite':
+        for sql in TRIGGERS_FTS_PEDIDO:
+            op.execute(sql)
+
+
+def upgrade():
+    bind = op.get_bind()
+    insp = sa.inspect(bind)
+
+    # Versiones anteriores hacían db.create_all() al arrancar: la tabla puede existir ya (vacía)
+    if 'cliente' not in insp.get_table_names():
+        op.create_table('cliente',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('nombre', sa.String(length=150), nullable=False),
+            sa.Column('nombre_normalizado', sa.String(length=150), nullable=False),
+            sa.Column('telefono', sa.String(length=50), nullable=True),
+            sa.Column('telefono_normalizado', sa.String(length=30), nullable=True),
+            sa.Column('direccion', sa.String(length=200), nullable=True),
+            sa.Column('email', sa.String(length=120), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('cliente', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_cliente_nombre_normalizado'), ['nombre_normalizado'], unique=False)
+            batch_op.create_index('ux_cliente_telefono_normalizado', ['telefono_normalizado'], unique=True)
+
+    with op.batch_alter_table('pedido', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cliente_id', sa.Integer(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_pedido_cliente_id'), ['cliente_id'], unique=False)
+        batch_op.create_foreign_key('fk_pedido_cliente_id', 'cliente', ['cliente_id'], ['id'])
+    _recrear_triggers_fts(bind)
+
+    # Backfill: un cliente por teléfono, con los datos del pedido más reciente
+    pedidos = bind.execute(sa.text(
+        "SELECT id, cliente, telefono, direccion, email, created_at FROM pedido ORDER BY id"
+    )).all()
+
+    por_tel = {}
+    for p in pedidos:
+        tel = _telefono(p.telefono)
+        if tel:
+            por_tel.setdefault(tel, []).append(p)
+
+    for tel, grupo in por_tel.items():
+        ultimo = grupo[-1]
+        cid = bind.execute(sa.text(
+            "INSERT INTO cliente (nombre, nombre_normalizado, telefono, telefono_normalizado, direccion, email, created_at) "
+            "VALUES (:nombre, :nombre_n, :telefono, :tel, :direccion, :email, :created_at) RETURNING id"
+        ), {
+            "nombre": ultimo.cliente,
+            "nombre_n": _nombre(ultimo.cliente),
+            "telefono": ultimo.telefono,
+            "tel": tel,
+            "direccion": next((p.direccion for p in reversed(grupo) if p.direccion), None),
+            "email": next((p.email for p in reversed(grupo) if p.email), None),
+            "created_at": grupo[0].created_at or datetime.utcnow(),
+        }).scalar_one()
+
+        bind.execute(
+            sa.text("UPDATE pedido SET cliente_id = :cid WHERE id = :pid"),
+            [{"cid": cid, "pid": p.id} for p in grupo],
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('pedido', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_pedido_cliente_id', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_pedido_cliente_id'))
+        batch_op.drop_column('cliente_id')
+    _recrear_triggers_fts(op.get_bind())
+
+    with op.batch_alter_table('cliente', schema=None) as batch_op:
+        batch_op.drop_index('ux_cliente_telefono_normalizado')
+        batch_op.drop_index(batch_op.f('ix_cliente_nombre_normalizado'))
+
+    op.drop_table('cliente')
@@ -0,0 +1,45 @@
+"""Historial de precios por metro
+
+Revision ID: 772673541c6f
+Revises: 456d38d7fe02
+Create Date: 2026-10-18 12:31:06.118402
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '772673541c6f'
+down_revision = '456d38d7fe02'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Versiones anteriores hacían db.create_all() al arrancar: la tabla puede existir ya (vacía)
+    if 'precio_historial' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('precio_historial',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('material', sa.String(length=120), nullable=False),
+            sa.Column('precio_anterior', sa.Float(), nullable=True),
+            sa.Column('precio_nuevo', sa.Float(), nullable=True),
+            sa.Column('cambiado_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('precio_historial', schema=None) as batch_op:
+            batch_op.create_index('ix_precio_historial_material_fecha', ['material', 'cambiado_at'], unique=False)
+
+    # Punto de partida: los precios actuales, vigentes "desde siempre" (no sabemos desde
+    # cuándo; así precio_en() responde también para fechas anteriores a la migración)
+    op.execute(
+        "INSERT INTO precio_historial (material, precio_anterior, precio_nuevo, cambiado_at) "
+        "SELECT material, NULL, precio, '1970-01-01 00:00:00' FROM precio_por_metro"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('precio_historial', schema=None) as batch_op:
+        batch_op.drop_index('ix_precio_historial_material_fecha')
+
+    op.drop_table('precio_historial')
@@ -0,0 +1,52 @@
+"""Quita pedido.version (el ETag del detalle usa pedido.cambio)
+
+Revision ID: 9b1f3c7d2e64
+Revises: 5a0d7e2c9b13
+Create Date: 2026-10-18 19:41:06.220913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b1f3c7d2e64'
+down_revision = '5a0d7e2c9b13'
+branch_labels = None
+depends_on = None
+
+
+# Triggers de pedido del índice FTS (3f91c6b8e0a4) al momento de la migración
+TRIGGERS_FTS_PEDIDO = [
+    """CREATE TRIGGER IF NOT EXISTS pedido_fts_ai AFTER INSERT ON pedido BEGIN
+        INSERT INTO pedido_fts (rowid, cliente, telefono, direccion, observaciones, items)
+        VALUES (NEW.id, NEW.cliente, NEW.telefono, NEW.direccion, NEW.observaciones, '');
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_fts_au AFTER UPDATE OF cliente, telefono, direccion, observaciones ON pedido BEGIN
+        UPDATE pedido_fts SET cliente = NEW.cliente, telefono = NEW.telefono,
+            direccion = NEW.direccion, observaciones = NEW.observaciones
+        WHERE rowid = NEW.id;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pedido_fts_ad AFTER DELETE ON pedido BEGIN
+        DELETE FROM pedido_fts WHERE rowid = OLD.id;
+    END""",
+]
+
+
+def _recrear_triggers_fts():
+    # En SQLite el batch recrea la tabla pedido y se lleva sus triggers del índice FTS
+    if op.get_bind().dialect.name == 'sqlite':
+        for sql in TRIGGERS_FTS_PEDIDO:
+            op.execute(sql)
+
+
+def upgrade():
+    with op.batch_alter_table('pedido', schema=None) as batch_op:
+        batch_op.drop_column('version')
+    _recrear_triggers_fts()
+
+
+def downgrade():
+    with op.batch_alter_table('pedido', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    _recrear_triggers_fts()
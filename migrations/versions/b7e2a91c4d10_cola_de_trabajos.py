@@ -0,0 +1,45 @@
+"""Cola de trabajos persistente
+
+Revision ID: b7e2a91c4d10
+Revises: caf9f33e8e9d
+Create Date: 2026-10-18 18:20:41.503117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e2a91c4d10'
+down_revision = 'caf9f33e8e9d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Versiones anteriores hacían db.create_all() al arrancar: la tabla puede existir ya (vacía)
+    if 'trabajo' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('trabajo',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('tipo', sa.String(length=50), nullable=False),
+            sa.Column('payload', sa.Text(), nullable=False),
+            sa.Column('estado', sa.String(length=20), nullable=False),
+            sa.Column('intentos', sa.Integer(), nullable=False),
+            sa.Column('max_intentos', sa.Integer(), nullable=False),
+            sa.Column('disponible_at', sa.DateTime(), nullable=False),
+            sa.Column('resultado', sa.Text(), nullable=True),
+            sa.Column('error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('iniciado_at', sa.DateTime(), nullable=True),
+            sa.Column('terminado_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('trabajo', schema=None) as batch_op:
+            batch_op.create_index('ix_trabajo_estado_disponible', ['estado', 'disponible_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('trabajo', schema=None) as batch_op:
+        batch_op.drop_index('ix_trabajo_estado_disponible')
+
+    op.drop_table('trabajo')
@@ -0,0 +1,40 @@
+"""Agrega total_pagado y saldo a pedido (índice de deudores)
+
+Revision ID: caf9f33e8e9d
+Revises: 772673541c6f
+Create Date: 2026-10-18 13:05:44.720931
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'caf9f33e8e9d'
+down_revision = '772673541c6f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pedido', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total_pagado', sa.Float(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('saldo', sa.Float(), server_default='0', nullable=False))
+
+    # Backfill desde pagos existentes (dos pasos: saldo usa el total_pagado ya calculado)
+    op.execute(
+        "UPDATE pedido SET total_pagado = coalesce("
+        "(SELECT sum(monto_pagado) FROM pago WHERE pago.pedido_id = pedido.id), 0)"
+    )
+    op.execute("UPDATE pedido SET saldo = total - coalesce(monto_sena, 0) - total_pagado")
+
+    with op.batch_alter_table('pedido', schema=None) as batch_op:
+        batch_op.create_index('ix_pedido_activos_saldo_id', ['saldo', 'id'], unique=False,
+                              sqlite_where=sa.text('activo = 1'), postgresql_where=sa.text('activo'))
+
+
+def downgrade():
+    with op.batch_alter_table('pedido', schema=None) as batch_op:
+        batch_op.drop_index('ix_pedido_activos_saldo_id')
+        batch_op.drop_column('saldo')
+        batch_op.drop_column('total_pagado')
@@ -0,0 +1,43 @@
+"""Tabla venta_diaria (rollup de ventas por día)
+
+Revision ID: d1eb2326424c
+Revises: 9765e9493c9c
+Create Date: 2026-10-18 10:12:41.305112
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1eb2326424c'
+down_revision = '9765e9493c9c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Versiones anteriores hacían db.create_all() al arrancar: la tabla puede existir ya (vacía)
+    if 'venta_diaria' not in sa.inspect(op.get_bind()).get_table_names():
+        op.create_table('venta_diaria',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('fecha', sa.Date(), nullable=False),
+            sa.Column('estado', sa.String(length=20), nullable=False),
+            sa.Column('activo', sa.Boolean(), nullable=False),
+            sa.Column('cantidad', sa.Integer(), nullable=False),
+            sa.Column('total', sa.Float(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('fecha', 'estado', 'activo', name='uq_venta_diaria_fecha_estado_activo')
+        )
+
+    # Backfill desde el historial (equivalente a `flask reconstruir-ventas`)
+    op.execute("DELETE FROM venta_diaria")
+    op.execute(
+        "INSERT INTO venta_diaria (fecha, estado, activo, cantidad, total) "
+        "SELECT date(created_at), estado, activo, count(id), coalesce(sum(total), 0.0) "
+        "FROM pedido GROUP BY date(created_at), estado, activo"
+    )
+
+
+def downgrade():
+    op.drop_table('venta_diaria')
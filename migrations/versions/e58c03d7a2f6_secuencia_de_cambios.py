@@ -0,0 +1,60 @@
+"""Secuencia global de cambios en pedido y lápidas de borrados
+
+Revision ID: e58c03d7a2f6
+Revises: b7e2a91c4d10
+Create Date: 2026-10-18 18:42:17.289534
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e58c03d7a2f6'
+down_revision = 'b7e2a91c4d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tablas = sa.inspect(op.get_bind()).get_table_names()
+
+    # Versiones anteriores hacían db.create_all() al arrancar: las tablas pueden existir ya (vacías)
+    if 'secuencia' not in tablas:
+        op.create_table('secuencia',
+            sa.Column('nombre', sa.String(length=50), nullable=False),
+            sa.Column('valor', sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint('nombre')
+        )
+    if 'pedido_borrado' not in tablas:
+        op.create_table('pedido_borrado',
+            sa.Column('pedido_id', sa.Integer(), nullable=False),
+            sa.Column('cambio', sa.Integer(), nullable=False),
+            sa.Column('borrado_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('pedido_id')
+        )
+        with op.batch_alter_table('pedido_borrado', schema=None) as batch_op:
+            batch_op.create_index(batch_op.f('ix_pedido_borrado_cambio'), ['cambio'], unique=False)
+
+    with op.batch_alter_table('pedido', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cambio', sa.Integer(), server_default='0', nullable=False))
+
+    # Backfill: el id ya es monótono; la secuencia arranca en el máximo
+    op.execute("UPDATE pedido SET cambio = id")
+    op.execute("DELETE FROM secuencia WHERE nombre = 'cambios'")
+    op.execute("INSERT INTO secuencia (nombre, valor) SELECT 'cambios', coalesce(max(id), 0) FROM pedido")
+
+    with op.batch_alter_table('pedido', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pedido_cambio'), ['cambio'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pedido', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pedido_cambio'))
+        batch_op.drop_column('cambio')
+
+    with op.batch_alter_table('pedido_borrado', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pedido_borrado_cambio'))
+
+    op.drop_table('pedido_borrado')
+    op.drop_table('secuencia')
@@ -1,10 +1,24 @@
+import argparse
 from app import create_app
 
-app = create_app()
-
+# `flask --app run ...` (db, seed, etc.) usa create_app() sin servidor: sin workers
+# ni chequeo de esquema. Solo `python run.py` arma la app del servidor.
 if __name__ == "__main__":
-    # LAN: 0.0.0.0 permite que otras PCs de la red entren
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    app = create_app(servidor=True)
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--serve", action="store_true", help="servidor de producción (waitress, sin debug)")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--threads", type=int)
+    args = parser.parse_args()
+
+    if args.serve:
+        from app import servidor
+        servidor.servir(app, host=args.host, port=args.port, threads=args.threads)
+    else:
+        # LAN: 0.0.0.0 permite que otras PCs de la red entren
+        app.run(host=args.host or "0.0.0.0", port=args.port or 5000, debug=True)
 
 #-----Subir al repo-----
 #git add .
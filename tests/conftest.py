@@ -0,0 +1,46 @@
+import pytest
+from app import create_app, db, busqueda
+from app.models import User, Producto, PrecioPorMetro, Secuencia, Pedido
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'app.db'}",
+        "UPLOADS_DIR": str(tmp_path / "uploads"),
+        "PDF_CACHE_DIR": str(tmp_path / "pdf_cache"),
+        "EXPORTACIONES_DIR": str(tmp_path / "exportaciones"),
+        "TRABAJOS_WORKERS": 0,
+    })
+    with app.app_context():
+        db.create_all()
+        busqueda.reconstruir()
+        db.session.add(User.create_default_admin())
+        db.session.add(Secuencia(nombre="cambios", valor=0))
+        db.session.add(PrecioPorMetro(material="Melamina", precio=7000))
+        db.session.add(Producto(nombre="Mesa", material="Pino", precio=1000, por_metro=False))
+        db.session.commit()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    c = app.test_client()
+    c.post("/login", data={"username": "admin", "password": "admin123"})
+    return c
+
+
+@pytest.fixture
+def crear_pedido(client):
+    """Alta por el presupuestador; devuelve el id del pedido creado."""
+    def crear(cliente="Ana", telefono="3515551234"):
+        producto = Producto.query.first()
+        resp = client.post("/presupuestador/crear_pedido", data={
+            "cliente": cliente, "telefono": telefono, "direccion": "Calle 1",
+            "prod_id[]": str(producto.id),
+        })
+        assert resp.status_code == 302
+        return db.session.query(db.func.max(Pedido.id)).scalar()
+    return crear
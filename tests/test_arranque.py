@@ -0,0 +1,40 @@
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+# Tope para la mediana de create_app() en un proceso nuevo (ms)
+PRESUPUESTO_MS = 200
+VECES = 3
+
+# Proceso nuevo: mide el import de la app y create_app() como en un arranque real
+_MEDIR = """
+import time
+t0 = time.perf_counter()
+from app import create_app
+t1 = time.perf_counter()
+create_app(servidor=True)
+t2 = time.perf_counter()
+print((t1 - t0) * 1000, (t2 - t1) * 1000)
+"""
+
+
+def test_create_app_dentro_del_presupuesto(tmp_path):
+    env = {
+        **os.environ,
+        "FLASK_SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'app.db'}",
+        "FLASK_UPLOADS_DIR": str(tmp_path / "uploads"),
+        "FLASK_PDF_CACHE_DIR": str(tmp_path / "pdf_cache"),
+        "FLASK_EXPORTACIONES_DIR": str(tmp_path / "exportaciones"),
+        "FLASK_TRABAJOS_WORKERS": "0",
+    }
+    raiz = Path(__file__).resolve().parent.parent
+
+    tiempos = []
+    for _ in range(VECES):
+        res = subprocess.run([sys.executable, "-c", _MEDIR], cwd=raiz, env=env,
+                             capture_output=True, text=True, check=True)
+        tiempos.append(float(res.stdout.split()[-1]))
+
+    assert statistics.median(tiempos) < PRESUPUESTO_MS, f"create_app(): {tiempos} ms"
@@ -0,0 +1,26 @@
+from app import create_app, db, revision_actual, heads_migraciones
+from app.models import User, Secuencia
+
+
+def test_seed_migra_una_base_vacia(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'vacia.db'}",
+        "UPLOADS_DIR": str(tmp_path / "uploads"),
+        "PDF_CACHE_DIR": str(tmp_path / "pdf_cache"),
+        "EXPORTACIONES_DIR": str(tmp_path / "exportaciones"),
+    })
+
+    res = app.test_cli_runner().invoke(args=["seed"])
+    assert res.exit_code == 0, res.output
+    assert "Esquema migrado." in res.output
+
+    with app.app_context():
+        assert revision_actual() in heads_migraciones()
+        assert User.query.filter_by(username="admin").one()
+        assert db.session.get(Secuencia, "cambios").valor == 0
+        # La tabla FTS y sus triggers vienen de la migración
+        assert db.session.execute(db.text("SELECT count(*) FROM pedido_fts")).scalar() == 0
+
+    # Ya en el head: no vuelve a migrar
+    assert "Esquema migrado." not in app.test_cli_runner().invoke(args=["seed"]).output
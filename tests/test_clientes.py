@@ -0,0 +1,26 @@
+from app import clientes
+
+
+def test_mismo_cliente_con_formatos_distintos(client, crear_pedido):
+    for tel in ["+54 9 351 555-1234", "0351 5551234", "351-555-1234"]:
+        crear_pedido(cliente="José Pérez", telefono=tel)
+
+    (c,) = clientes.autocompletar("jose")
+    assert c.telefono_normalizado == "3515551234"
+    assert len(c.pedidos) == 3
+
+
+def test_autocompletar_prefijo_de_pais_a_medio_tipear(client, crear_pedido):
+    crear_pedido(cliente="Ana", telefono="351-555-1234")
+
+    for texto in ["+54 9 351", "549351", "+54 351", "0351 55", "351"]:
+        assert [c.nombre for c in clientes.autocompletar(texto)] == ["Ana"], texto
+
+
+def test_autocompletar_telefono_con_separadores(client, crear_pedido):
+    crear_pedido(cliente="Ana", telefono="351-555-1234")
+
+    for texto in ["351-555-12", "(351) 555-1234", "0351-555-1234", "351 555 1234", "+54 (351) 555"]:
+        assert [c.nombre for c in clientes.autocompletar(texto)] == ["Ana"], texto
+    # Letras mezcladas: búsqueda por nombre
+    assert clientes.autocompletar("351-abc") == []
@@ -0,0 +1,78 @@
+import hashlib
+import os
+from datetime import date
+from io import BytesIO
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+from app import db, comprobantes
+from app.models import Pedido, Pago, PagoComprobante
+
+
+def _foto_guardada(uploads_dir):
+    # Foto grande con ruido (comprime mal), guardada con su sha como nombre
+    img = Image.effect_noise((2400, 1800), 64).convert("RGB")
+    tmp = os.path.join(uploads_dir, "tmp.jpg")
+    img.save(tmp, "JPEG", quality=98)
+    with open(tmp, "rb") as f:
+        nombre = hashlib.sha256(f.read()).hexdigest() + ".jpg"
+    os.replace(tmp, os.path.join(uploads_dir, nombre))
+    return nombre
+
+
+def test_recomprimir_publica_con_nombre_nuevo(app, client, crear_pedido):
+    uploads_dir = app.config["UPLOADS_DIR"]
+    viejo = _foto_guardada(uploads_dir)
+
+    pedido = db.session.get(Pedido, crear_pedido())
+    pago = Pago(pedido=pedido, metodo="Transferencia", monto_pagado=100, fecha_pago=date.today())
+    pago.comprobantes.append(PagoComprobante(filename=viejo, original_name="foto.jpg", mimetype="image/jpeg",
+                                             size_bytes=os.path.getsize(os.path.join(uploads_dir, viejo))))
+    db.session.add(pago)
+    db.session.commit()
+    cambio_antes = pedido.cambio
+
+    res = app.test_cli_runner().invoke(args=["recomprimir-comprobantes", "--max-lado", "800", "--workers", "1"])
+    assert res.exit_code == 0, res.output
+
+    db.session.expire_all()
+    comp = PagoComprobante.query.one()
+    nuevo_path = os.path.join(uploads_dir, comp.filename)
+    assert comp.filename != viejo
+    assert not os.path.exists(os.path.join(uploads_dir, viejo))
+    with open(nuevo_path, "rb") as f:
+        assert hashlib.sha256(f.read()).hexdigest() + ".jpg" == comp.filename
+    assert comp.size_bytes == os.path.getsize(nuevo_path)
+    assert any(n.startswith(comp.filename + ".thumb.") for n in os.listdir(uploads_dir))
+    assert db.session.get(Pedido, pedido.id).cambio > cambio_antes
+
+    r = client.get(f"/uploads/comprobantes/{comp.filename}")
+    assert r.status_code == 200
+    assert r.headers["ETag"].strip('"') == comp.filename[:-4]
+
+
+def _sha_nombre(uploads_dir, filename):
+    with open(os.path.join(uploads_dir, filename), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest() + os.path.splitext(filename)[1]
+
+
+def test_upload_y_recompresion_usan_el_mismo_nombre(app):
+    uploads_dir = app.config["UPLOADS_DIR"]
+    viejo = _foto_guardada(uploads_dir)        # guardado antes de recodificar uploads
+    with open(os.path.join(uploads_dir, viejo), "rb") as f:
+        foto = f.read()
+    opciones = {"max_lado": 800, "calidad": 80, "guardar_original": False}
+
+    def subir():
+        archivo = FileStorage(stream=BytesIO(foto), filename="foto.jpg", content_type="image/jpeg")
+        return comprobantes.guardar(archivo, uploads_dir, None, opciones)[0]
+
+    # Mientras exista tal cual, el upload lo reutiliza
+    assert subir() == viejo
+
+    nuevo, _, _ = comprobantes.recomprimir_guardado(uploads_dir, viejo, 800, 80)
+    comprobantes.borrar_guardado(uploads_dir, viejo)
+    assert nuevo == _sha_nombre(uploads_dir, nuevo)
+
+    # La misma foto subida de nuevo cae en el archivo recomprimido
+    assert subir() == nuevo
+    assert sorted(n for n in os.listdir(uploads_dir) if ".thumb." not in n) == [nuevo]
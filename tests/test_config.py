@@ -0,0 +1,8 @@
+from app import create_app, db
+
+
+def test_sqlite_en_memoria_sin_opciones_de_pool():
+    app = create_app({"TESTING": True, "SQLALCHEMY_DATABASE_URI": "sqlite://", "TRABAJOS_WORKERS": 0})
+    assert "pool_size" not in app.config["SQLALCHEMY_ENGINE_OPTIONS"]
+    with app.app_context():
+        assert db.session.execute(db.text("SELECT 1")).scalar() == 1
@@ -0,0 +1,27 @@
+import time
+from app import eventos
+
+
+def test_sse_con_limite_y_polling_sin_lugar(app, client):
+    app.config["EVENTOS_MAX_ESPERAS"] = 1
+    cursor = eventos.cursor_actual()
+
+    # El long-poll devuelve su lugar al terminar
+    for _ in range(2):
+        resp = client.get(f"/api/eventos?cursor={cursor}&timeout=0")
+        assert resp.status_code == 200 and "reintentar" not in resp.json
+
+    stream = client.get(f"/api/eventos/stream?cursor={cursor}")
+    assert stream.status_code == 200
+    assert client.get(f"/api/eventos/stream?cursor={cursor}").status_code == 503
+
+    # Sin lugar: el long-poll no espera, pero igual entrega los eventos
+    eventos.publicar("pedido_movido", id=1)
+    t0 = time.monotonic()
+    data = client.get(f"/api/eventos?cursor={cursor}").json
+    assert time.monotonic() - t0 < 1
+    assert [e["id"] for e in data["eventos"]] == [1]
+    assert data["reintentar"] == app.config["EVENTOS_POLL_INTERVALO"]
+
+    stream.close()
+    assert "reintentar" not in client.get(f"/api/eventos?cursor={data['cursor']}&timeout=0").json
@@ -0,0 +1,73 @@
+import re
+import pytest
+from sqlalchemy import event
+from app import db, trabajos
+from app.models import Pedido
+
+# Recorrido completo de una tabla: "SCAN pedido" (o "SCAN TABLE pedido" en SQLite < 3.36).
+# "SCAN pedido USING INDEX ..." y las tablas virtuales (FTS) no entran.
+_SCAN_COMPLETO = re.compile(r"^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$")
+
+# Catálogos chicos que las rutas leen enteros a propósito
+_TABLAS_CHICAS = {"user", "producto", "precio_por_metro", "secuencia", "sqlite_master"}
+
+# Lecturas calientes: kanban, detalle, dashboard, listados/sync, deudores, búsqueda, clientes
+_RUTAS = [
+    "/pedidos",
+    "/api/pedidos/kanban/PENDIENTE?after={pid}",
+    "/api/pedidos/{pid}",
+    "/dashboard",
+    "/api/dashboard/resumen",
+    "/api/dashboard/ventas?dias=30",
+    "/api/dashboard/ventas?dias=365&agrupar=mes",
+    "/api/pedidos",
+    "/api/pedidos?after={pid}",
+    "/api/pedidos?estado=PENDIENTE",
+    "/api/pedidos?since=0",
+    "/api/pedidos/deudores",
+    "/api/pedidos/deudores?after=1000.0:{pid}",
+    "/api/buscar?q=ana",
+    "/api/clientes/autocompletar?q=an",
+    "/api/clientes/autocompletar?q=%2B54 9 351",
+    "/api/clientes/{cid}/pedidos",
+]
+
+
+@pytest.fixture
+def consultas(app):
+    """SQL ejecutado (sentencia, parámetros) mientras corre el test."""
+    capturadas = []
+
+    def _registrar(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            capturadas.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", _registrar)
+    yield capturadas
+    event.remove(db.engine, "before_cursor_execute", _registrar)
+
+
+def _scans_completos(statement, parameters):
+    with db.engine.connect() as conn:
+        plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).all()
+    return [
+        fila[3] for fila in plan
+        if (m := _SCAN_COMPLETO.match(fila[3])) and m.group(1) not in _TABLAS_CHICAS
+    ]
+
+
+def test_rutas_calientes_sin_recorrer_tablas(app, client, crear_pedido, consultas):
+    crear_pedido(cliente="Ana", telefono="351-555-1234")
+    pid = crear_pedido(cliente="Beto", telefono="351-555-9999")
+    cid = db.session.get(Pedido, pid).cliente_id
+    consultas.clear()
+
+    for url in _RUTAS:
+        resp = client.get(url.format(pid=pid, cid=cid))
+        assert resp.status_code == 200, url
+    trabajos.encolar("miniatura", filename="x.png")
+    trabajos._tomar(app)
+
+    assert consultas
+    fallas = {sql: scans for sql, params in consultas if (scans := _scans_completos(sql, params))}
+    assert not fallas, "\n\n".join(f"{' | '.join(s)}\n{sql}" for sql, s in fallas.items())
@@ -0,0 +1,38 @@
+import os
+from app import pdf
+
+
+def test_last_modified_estable_entre_hits(app, client, crear_pedido):
+    pid = crear_pedido()
+    assert client.get(f"/pedidos/{pid}/pdf").status_code == 200
+
+    # Generado "hace tiempo": un hit no tiene que moverle el mtime
+    cache_dir = app.config["PDF_CACHE_DIR"]
+    (nombre,) = os.listdir(cache_dir)
+    os.utime(os.path.join(cache_dir, nombre), (1577836800, 1577836800))  # 2020-01-01
+
+    r1 = client.get(f"/pedidos/{pid}/pdf")
+    r2 = client.get(f"/pedidos/{pid}/pdf")
+    assert r1.headers["Last-Modified"] == r2.headers["Last-Modified"] == "Wed, 01 Jan 2020 00:00:00 GMT"
+
+    r3 = client.get(f"/pedidos/{pid}/pdf", headers={"If-Modified-Since": r1.headers["Last-Modified"]})
+    assert r3.status_code == 304
+
+
+def test_pdf_evictado_antes_de_enviar_se_regenera(client, crear_pedido, monkeypatch):
+    pid = crear_pedido()
+    original = pdf.pdf_cacheado
+    llamadas = []
+
+    def evictado_una_vez(cache_dir, d, max_bytes):
+        path, clave = original(cache_dir, d, max_bytes)
+        if not llamadas:
+            os.remove(path)   # otro request lo borró entre el chequeo y el send_file
+        llamadas.append(path)
+        return path, clave
+
+    monkeypatch.setattr(pdf, "pdf_cacheado", evictado_una_vez)
+    r = client.get(f"/pedidos/{pid}/pdf")
+    assert r.status_code == 200
+    assert r.data.startswith(b"%PDF")
+    assert len(llamadas) == 2
@@ -0,0 +1,37 @@
+from app import db
+from app.models import Pedido
+
+
+def test_detalle_304_con_mismo_etag(client, crear_pedido):
+    pid = crear_pedido()
+    r = client.get(f"/api/pedidos/{pid}")
+    assert r.status_code == 200
+
+    r2 = client.get(f"/api/pedidos/{pid}", headers={"If-None-Match": r.headers["ETag"]})
+    assert r2.status_code == 304
+
+
+def test_etag_no_se_repite_si_se_reutiliza_el_id(app, client, crear_pedido):
+    pid = crear_pedido(cliente="Viejo")
+    etag_viejo = client.get(f"/api/pedidos/{pid}").headers["ETag"]
+
+    client.post(f"/pedidos/eliminar/{pid}")
+    assert db.session.get(Pedido, pid) is None
+
+    nuevo = crear_pedido(cliente="Nuevo")
+    assert nuevo == pid          # SQLite reutiliza el id borrado
+
+    r = client.get(f"/api/pedidos/{nuevo}", headers={"If-None-Match": etag_viejo})
+    assert r.status_code == 200
+    assert r.json["cliente"] == "Nuevo"
+
+
+def test_detalle_usa_saldo_mantenido(client, crear_pedido):
+    pid = crear_pedido()
+    p = db.session.get(Pedido, pid)
+    p.total_pagado, p.saldo = 400.0, p.total - 400.0
+    db.session.commit()
+
+    r = client.get(f"/api/pedidos/{pid}").json
+    assert r["total_pagado"] == 400.0
+    assert r["debe"] == p.saldo
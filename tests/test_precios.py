@@ -0,0 +1,28 @@
+from datetime import datetime, timedelta
+from app import db, precios
+from app.models import PrecioHistorial
+
+
+def test_precio_en_fecha_anterior_al_alta(app):
+    precios.guardar_precios({"Melamina": 7000, "Roble": 9000})
+    db.session.commit()
+
+    assert precios.precio_en("Roble", datetime(2020, 1, 1)) is None
+    assert precios.precio_en("Roble", datetime.utcnow() + timedelta(seconds=1)) == 9000
+
+
+def test_precio_en_seed_de_la_migracion(app):
+    # El seed de la migración queda vigente desde 1970
+    db.session.add(PrecioHistorial(material="Melamina", precio_anterior=None, precio_nuevo=7000,
+                                   cambiado_at=datetime(1970, 1, 1)))
+    db.session.commit()
+
+    assert precios.precio_en("Melamina", datetime(2020, 1, 1)) == 7000
+
+
+def test_precio_en_antes_y_despues_de_un_cambio(app):
+    precios.guardar_precios({"Melamina": 8000})
+    db.session.commit()
+
+    assert precios.precio_en("Melamina", datetime(2020, 1, 1)) == 7000
+    assert precios.precio_en("Melamina", datetime.utcnow() + timedelta(seconds=1)) == 8000
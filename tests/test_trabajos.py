@@ -0,0 +1,30 @@
+import logging
+from app import db, trabajos
+from app.models import Trabajo
+
+
+@trabajos.tarea("test_falla")
+def _falla(app):
+    raise RuntimeError("se rompió")
+
+
+def test_tarea_que_falla_guarda_error_y_loguea(app, caplog):
+    tid = trabajos.encolar("test_falla", max_intentos=1).id
+    db.session.commit()
+
+    with caplog.at_level(logging.ERROR):
+        trabajos._ejecutar(app, trabajos._tomar(app))
+
+    t = db.session.get(Trabajo, tid)
+    assert t.estado == "fallido"
+    assert t.error == "RuntimeError: se rompió"
+    assert any(r.exc_info for r in caplog.records)
+
+
+def test_error_fuera_de_la_tarea_queda_en_el_trabajo(app):
+    tid = trabajos.encolar("test_falla").id
+    db.session.commit()
+
+    trabajos._registrar_error(app, tid, OSError("disco lleno"))
+    db.session.expire_all()
+    assert db.session.get(Trabajo, tid).error == "OSError: disco lleno"